@@ -0,0 +1,149 @@
+import json
+import zlib
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ChatArchive, ChatMessage, ConversationSummary
+from .pagination import build_page, get_page_params, newer_than, older_than
+from .signals import conversation_changed
+
+
+def _key(item):
+    return parse_datetime(item['created_at']), item['id']
+
+
+def _pack(items):
+    return zlib.compress(json.dumps(items, separators=(',', ':')).encode())
+
+
+def _unpack(data):
+    return json.loads(zlib.decompress(bytes(data)))
+
+
+def archive_messages(older_than_days=None, batch_size=1000):
+    """
+    Move messages created more than `older_than_days` ago (default
+    CHAT_ARCHIVE_AFTER_DAYS) into ChatArchive rows. Each conversation is
+    archived oldest first, so its archive is always a prefix of its history.
+    Returns the number of messages archived.
+    """
+    from .serializers import ChatMessageSerializer
+
+    if older_than_days is None:
+        older_than_days = settings.CHAT_ARCHIVE_AFTER_DAYS
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+
+    threads = ChatMessage.objects.filter(created_at__lt=cutoff).values_list(
+        'student_lead_id', 'supervisor_id'
+    ).distinct().order_by()
+
+    archived = 0
+    for student_lead_id, supervisor_id in threads:
+        while True:
+            with transaction.atomic():
+                messages = list(
+                    ChatMessage.objects.filter(
+                        student_lead_id=student_lead_id,
+                        supervisor_id=supervisor_id,
+                        created_at__lt=cutoff,
+                    ).select_related('user').order_by('created_at', 'id')[:batch_size]
+                )
+                if not messages:
+                    break
+
+                periods = {}
+                for message, item in zip(messages, ChatMessageSerializer(messages, many=True).data):
+                    periods.setdefault(message.created_at.strftime('%Y-%m'), []).append(dict(item))
+
+                for period, items in periods.items():
+                    archive = ChatArchive.objects.select_for_update().filter(
+                        student_lead_id=student_lead_id, supervisor_id=supervisor_id, period=period
+                    ).first()
+                    if archive is None:
+                        archive = ChatArchive(student_lead_id=student_lead_id, supervisor_id=supervisor_id, period=period)
+                    else:
+                        known = {item['id'] for item in items}
+                        items = [item for item in _unpack(archive.data) if item['id'] not in known] + items
+                        items.sort(key=_key)
+
+                    archive.data = _pack(items)
+                    archive.message_count = len(items)
+                    archive.oldest_at = _key(items[0])[0]
+                    archive.newest_at = _key(items[-1])[0]
+                    archive.save()
+
+                ChatMessage.objects.filter(id__in=[message.id for message in messages]).delete()
+                archived += len(messages)
+                # The conversation's last message may have gone with them
+                conversation_changed.send(
+                    sender=ConversationSummary, student_lead_id=student_lead_id, supervisor_id=supervisor_id
+                )
+
+            if len(messages) < batch_size:
+                break
+
+    return archived
+
+
+def archived_messages(student_lead_id, supervisor_id, before=None, after=None):
+    """
+    Iterate over the archived, already serialized messages of a conversation.
+
+    Newest first, optionally only those strictly older than the `before`
+    (created_at, id) key; with `after`, oldest first and strictly newer.
+    Archive blocks are decompressed lazily, one month at a time.
+    """
+    archives = ChatArchive.objects.filter(student_lead_id=student_lead_id, supervisor_id=supervisor_id)
+    if after is not None:
+        archives = archives.filter(newest_at__gte=after[0]).order_by('period')
+    else:
+        if before is not None:
+            archives = archives.filter(oldest_at__lte=before[0])
+        archives = archives.order_by('-period')
+
+    for data in archives.values_list('data', flat=True).iterator(chunk_size=1):
+        items = _unpack(data)
+        if after is not None:
+            yield from (item for item in items if _key(item) > after)
+        else:
+            yield from (item for item in reversed(items) if before is None or _key(item) < before)
+
+
+def paginate_with_archive(queryset, request, student_lead_id, supervisor_id):
+    """
+    `paginate_thread` over the live messages of a conversation followed by its
+    archive. Returns (serialized messages, page_info).
+    """
+    from .serializers import ChatMessageSerializer
+
+    before, after, limit = get_page_params(request)
+
+    if after:
+        # The archive holds the oldest part of the thread, so it comes first
+        rows = list(islice(archived_messages(student_lead_id, supervisor_id, after=after), limit + 1))
+        if len(rows) <= limit:
+            live = queryset.filter(newer_than(after)).order_by('created_at', 'id')[:limit + 1 - len(rows)]
+            rows += ChatMessageSerializer(live, many=True).data
+    else:
+        if before:
+            queryset = queryset.filter(older_than(before))
+        live = list(queryset.order_by('-created_at', '-id')[:limit + 1])
+        rows = list(ChatMessageSerializer(live, many=True).data)
+        if len(live) <= limit:
+            boundary = (live[-1].created_at, live[-1].id) if live else before
+            rows += islice(archived_messages(student_lead_id, supervisor_id, before=boundary), limit + 1 - len(rows))
+
+    return build_page(rows, limit, before, after, _key)
+
+
+def thread_with_archive(queryset, student_lead_id, supervisor_id):
+    """The whole conversation, archived history first, serialized and oldest first."""
+    from .serializers import ChatMessageSerializer
+
+    archived = list(archived_messages(student_lead_id, supervisor_id))[::-1]
+    return archived + list(ChatMessageSerializer(queryset.order_by('created_at', 'id'), many=True).data)
@@ -0,0 +1,172 @@
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+
+def channel_name(student_lead_id, supervisor_id):
+    return f"chat.{student_lead_id}.{supervisor_id}"
+
+
+class BaseBroker:
+    """
+    Fan-out of chat events to subscribers of a conversation channel.
+
+    Callbacks are invoked with the published payload from whichever thread
+    delivers it, so they must be cheap and thread-safe (e.g. set an Event or
+    hand the payload to an event loop with call_soon_threadsafe).
+    """
+
+    def publish(self, channel, payload):
+        raise NotImplementedError
+
+    def subscribe(self, channel, callback):
+        raise NotImplementedError
+
+    def unsubscribe(self, channel, callback):
+        raise NotImplementedError
+
+
+class InProcessBroker(BaseBroker):
+    """Delivers events to subscribers living in the same process only."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, channel, payload):
+        self._dispatch(channel, payload)
+
+    def subscribe(self, channel, callback):
+        with self._lock:
+            self._subscribers[channel].add(callback)
+
+    def unsubscribe(self, channel, callback):
+        with self._lock:
+            callbacks = self._subscribers.get(channel)
+            if callbacks is None:
+                return
+            callbacks.discard(callback)
+            if not callbacks:
+                del self._subscribers[channel]
+
+    def _channels(self):
+        with self._lock:
+            return list(self._subscribers)
+
+    def _dispatch(self, channel, payload):
+        with self._lock:
+            callbacks = list(self._subscribers.get(channel, ()))
+        for callback in callbacks:
+            try:
+                callback(payload)
+            except Exception:
+                logger.exception("Chat broker subscriber failed on %s", channel)
+
+
+class DatabaseBroker(InProcessBroker):
+    """
+    Shares events between worker processes through the `ChatEvent` table.
+
+    Local subscribers are notified immediately; a background thread in every
+    process polls for events published elsewhere and relays them. Events are
+    pruned once they are older than CHAT_EVENT_RETENTION seconds.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.origin = uuid.uuid4().hex
+        self._poller = None
+        self._last_id = None
+
+    def publish(self, channel, payload):
+        from .models import ChatEvent
+
+        ChatEvent.objects.create(channel=channel, origin=self.origin, payload=payload)
+        self._dispatch(channel, payload)
+
+    def subscribe(self, channel, callback):
+        from .models import ChatEvent
+
+        super().subscribe(channel, callback)
+        with self._lock:
+            if self._poller is None:
+                # Relay only what is published from here on
+                self._last_id = ChatEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+                self._poller = threading.Thread(target=self._poll, name="chat-broker-poller", daemon=True)
+                self._poller.start()
+
+    def _poll(self):
+        from .models import ChatEvent
+
+        interval = settings.CHAT_BROKER_POLL_INTERVAL
+        retention = timedelta(seconds=settings.CHAT_EVENT_RETENTION)
+        polls = 0
+        while True:
+            time.sleep(interval)
+            try:
+                channels = self._channels()
+                if channels:
+                    events = ChatEvent.objects.filter(
+                        id__gt=self._last_id, channel__in=channels
+                    ).exclude(origin=self.origin).order_by('id')
+                    for event in events:
+                        self._last_id = event.id
+                        self._dispatch(event.channel, event.payload)
+
+                polls += 1
+                if polls % 100 == 0:
+                    ChatEvent.objects.filter(created_at__lt=timezone.now() - retention).delete()
+            except Exception:
+                logger.exception("Chat broker poll failed")
+            finally:
+                close_old_connections()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.CHAT_BROKER)()
+    return _broker
+
+
+def publish_messages(messages, data=None):
+    """
+    Broadcast messages to their conversations once the current transaction
+    commits. `data` may carry the already serialized messages.
+    """
+    if data is None:
+        from .serializers import ChatMessageSerializer
+
+        data = ChatMessageSerializer(messages, many=True).data
+
+    payloads = [
+        (channel_name(message.student_lead_id, message.supervisor_id), {'type': 'chat.message', 'message': item})
+        for message, item in zip(messages, data)
+    ]
+
+    def send():
+        broker = get_broker()
+        for channel, payload in payloads:
+            try:
+                broker.publish(channel, payload)
+            except Exception:
+                logger.exception("Failed to publish chat message on %s", channel)
+
+    transaction.on_commit(send)
@@ -0,0 +1,76 @@
+from django.db import transaction
+from rest_framework import serializers
+
+from userAuthe.models import StudentLead, Supervisor
+from .broker import publish_messages
+from .models import ChatMessage, ConversationSummary
+
+
+MAX_BATCH_SIZE = 5000
+INSERT_BATCH_SIZE = 500
+
+
+class ChatMessageIngestSerializer(serializers.Serializer):
+    # Shape-only validation; foreign keys are resolved for the whole batch at once
+    student_lead = serializers.IntegerField(min_value=1)
+    supervisor = serializers.IntegerField(min_value=1)
+    content = serializers.CharField(max_length=200)
+
+
+def ingest_messages(items, user):
+    """
+    Validate and insert a batch of chat messages sent by `user`.
+
+    Returns one result per input item, in order: {"index", "status": "created",
+    "id"} or {"index", "status": "invalid" | "forbidden", "errors"}; items for
+    a conversation `user` is not part of are forbidden. Valid items are
+    inserted together in one transaction even if others in the batch are
+    rejected.
+    """
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        serializer = ChatMessageIngestSerializer(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = {'index': index, 'status': 'invalid', 'errors': serializer.errors}
+
+    student_lead_ids = set(StudentLead.objects.filter(
+        pk__in={data['student_lead'] for _, data in valid}
+    ).values_list('pk', flat=True))
+    supervisor_ids = set(Supervisor.objects.filter(
+        pk__in={data['supervisor'] for _, data in valid}
+    ).values_list('pk', flat=True))
+
+    pending = []
+    for index, data in valid:
+        if user.id not in (data['student_lead'], data['supervisor']):
+            results[index] = {'index': index, 'status': 'forbidden',
+                              'errors': {'non_field_errors': ['You are not part of this conversation.']}}
+            continue
+        errors = {}
+        if data['student_lead'] not in student_lead_ids:
+            errors['student_lead'] = [f'Invalid pk "{data["student_lead"]}" - object does not exist.']
+        if data['supervisor'] not in supervisor_ids:
+            errors['supervisor'] = [f'Invalid pk "{data["supervisor"]}" - object does not exist.']
+        if errors:
+            results[index] = {'index': index, 'status': 'invalid', 'errors': errors}
+            continue
+        pending.append((index, ChatMessage(
+            user=user,
+            student_lead_id=data['student_lead'],
+            supervisor_id=data['supervisor'],
+            content=data['content'],
+        )))
+
+    if pending:
+        messages = [message for _, message in pending]
+        with transaction.atomic():
+            ChatMessage.objects.bulk_create(messages, batch_size=INSERT_BATCH_SIZE)
+            ConversationSummary.record_messages(messages)
+            publish_messages(messages)
+        for index, message in pending:
+            results[index] = {'index': index, 'status': 'created', 'id': message.id}
+
+    return results
@@ -0,0 +1,91 @@
+import asyncio
+import json
+import re
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+
+from .broker import channel_name, get_broker
+
+
+CHAT_SOCKET_PATH = re.compile(r'^/ws/chat/(?P<student_lead_id>\d+)/(?P<supervisor_id>\d+)/$')
+
+# Application-defined close codes (4000-4999)
+CLOSE_NOT_FOUND = 4404
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_FORBIDDEN = 4403
+
+
+def authenticate(raw_token):
+    # Same checks as the REST endpoints' JWTAuthentication, token passed as ?token=
+    authentication = JWTAuthentication()
+    try:
+        validated_token = authentication.get_validated_token(raw_token)
+        return authentication.get_user(validated_token)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+async def chat_socket(scope, receive, send):
+    """
+    ASGI WebSocket endpoint at /ws/chat/<student_lead_id>/<supervisor_id>/?token=<access>.
+
+    Pushes every message created in the conversation as a JSON text frame
+    {"type": "chat.message", "message": {...}} in the ChatMessageSerializer
+    format. Only the two participants of the conversation may subscribe.
+    """
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+
+    match = CHAT_SOCKET_PATH.match(scope['path'])
+    if match is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+    student_lead_id = int(match['student_lead_id'])
+    supervisor_id = int(match['supervisor_id'])
+
+    query = parse_qs(scope.get('query_string', b'').decode())
+    raw_token = query.get('token', [''])[0]
+    user = await sync_to_async(authenticate)(raw_token) if raw_token else None
+    if user is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+        return
+    if user.id not in (student_lead_id, supervisor_id):
+        await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+        return
+
+    await send({'type': 'websocket.accept'})
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def deliver(payload):
+        # Called from whichever thread published the event
+        loop.call_soon_threadsafe(queue.put_nowait, payload)
+
+    channel = channel_name(student_lead_id, supervisor_id)
+    broker = get_broker()
+    await sync_to_async(broker.subscribe)(channel, deliver)
+
+    async def relay():
+        while True:
+            payload = await queue.get()
+            await send({'type': 'websocket.send', 'text': json.dumps(payload)})
+
+    async def drain():
+        # The channel is push-only; incoming frames are ignored until the client leaves
+        while True:
+            event = await receive()
+            if event['type'] == 'websocket.disconnect':
+                return
+
+    tasks = [asyncio.ensure_future(relay()), asyncio.ensure_future(drain())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        broker.unsubscribe(channel, deliver)
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from chat.archive import archive_messages
+
+
+class Command(BaseCommand):
+    help = "Move old chat messages into compressed monthly archives."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.CHAT_ARCHIVE_AFTER_DAYS,
+            help="Archive messages older than this many days (default: CHAT_ARCHIVE_AFTER_DAYS).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Messages moved per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        archived = archive_messages(options['days'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} chat messages."))
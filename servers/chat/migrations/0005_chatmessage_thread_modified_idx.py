@@ -0,0 +1,20 @@
+# Generated by Django 5.1.5 on 2026-10-18 17:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0004_chatmessage_thread_cursor_idx'),
+        ('userAuthe', '0017_delete_passwordresettoken'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['student_lead', 'supervisor', 'modified_at'], name='chat_thread_modified_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.5 on 2026-10-18 17:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_summaries(apps, schema_editor):
+    # Existing conversations start with their latest message and nothing unread
+    ChatMessage = apps.get_model('chat', 'ChatMessage')
+    ConversationSummary = apps.get_model('chat', 'ConversationSummary')
+
+    summaries = {}
+    for message in ChatMessage.objects.order_by('created_at', 'id').iterator():
+        summaries[(message.student_lead_id, message.supervisor_id)] = message
+    ConversationSummary.objects.bulk_create([
+        ConversationSummary(
+            student_lead_id=student_lead_id,
+            supervisor_id=supervisor_id,
+            last_message=message,
+            last_activity_at=message.created_at,
+        )
+        for (student_lead_id, supervisor_id), message in summaries.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0006_chatevent'),
+        ('userAuthe', '0017_delete_passwordresettoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_activity_at', models.DateTimeField()),
+                ('student_unread', models.PositiveIntegerField(default=0)),
+                ('supervisor_unread', models.PositiveIntegerField(default=0)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='chat.chatmessage')),
+                ('student_lead', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations', to='userAuthe.studentlead')),
+                ('supervisor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations', to='userAuthe.supervisor')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['supervisor', '-last_activity_at'], name='chat_summary_inbox_idx')],
+                'unique_together': {('student_lead', 'supervisor')},
+            },
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Full-text index over chat_chatmessage.content.
+#
+# SQLite: an external-content FTS5 table kept in sync by triggers. Django
+# rebuilds SQLite tables for some schema changes, which drops triggers, so a
+# migration that alters chat_chatmessage must call install_search_index again.
+# PostgreSQL: a GIN expression index, maintained by the database itself.
+
+from django.db import migrations
+
+
+SQLITE_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS chat_chatmessage_fts USING fts5("
+    "content, content='chat_chatmessage', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS chat_chatmessage_fts_ai AFTER INSERT ON chat_chatmessage BEGIN "
+    "INSERT INTO chat_chatmessage_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS chat_chatmessage_fts_ad AFTER DELETE ON chat_chatmessage BEGIN "
+    "INSERT INTO chat_chatmessage_fts(chat_chatmessage_fts, rowid, content) VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS chat_chatmessage_fts_au AFTER UPDATE OF content ON chat_chatmessage BEGIN "
+    "INSERT INTO chat_chatmessage_fts(chat_chatmessage_fts, rowid, content) VALUES ('delete', old.id, old.content); "
+    "INSERT INTO chat_chatmessage_fts(rowid, content) VALUES (new.id, new.content); END",
+    "INSERT INTO chat_chatmessage_fts(chat_chatmessage_fts) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS chat_chatmessage_fts_ai",
+    "DROP TRIGGER IF EXISTS chat_chatmessage_fts_ad",
+    "DROP TRIGGER IF EXISTS chat_chatmessage_fts_au",
+    "DROP TABLE IF EXISTS chat_chatmessage_fts",
+]
+
+POSTGRES_INSTALL = [
+    "CREATE INDEX IF NOT EXISTS chat_chatmessage_content_fts "
+    "ON chat_chatmessage USING GIN (to_tsvector('english', content))",
+]
+
+POSTGRES_UNINSTALL = [
+    "DROP INDEX IF EXISTS chat_chatmessage_content_fts",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def install_search_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_INSTALL, 'postgresql': POSTGRES_INSTALL})
+
+
+def uninstall_search_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRES_UNINSTALL})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0007_conversationsummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
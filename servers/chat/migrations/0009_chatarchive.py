@@ -0,0 +1,35 @@
+# Generated by Django 5.1.5 on 2026-10-18 17:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0008_chatmessage_search_index'),
+        ('userAuthe', '0017_delete_passwordresettoken'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='chatmessage',
+            options={},
+        ),
+        migrations.CreateModel(
+            name='ChatArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=7)),
+                ('message_count', models.PositiveIntegerField(default=0)),
+                ('oldest_at', models.DateTimeField()),
+                ('newest_at', models.DateTimeField()),
+                ('data', models.BinaryField()),
+                ('student_lead', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='userAuthe.studentlead')),
+                ('supervisor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='userAuthe.supervisor')),
+            ],
+            options={
+                'unique_together': {('student_lead', 'supervisor', 'period')},
+            },
+        ),
+    ]
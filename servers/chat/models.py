@@ -5,7 +5,11 @@
 
 
 from django.db import models
+from django.db.models import Count, Exists, F, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from userAuthe.models import StudentProject, StudentLead, Supervisor, User
+from .signals import conversation_changed
 
 
 class ChatMessage(models.Model):
@@ -17,4 +21,149 @@ class ChatMessage(models.Model):
     modified_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ('-modified_at',)
+        # No default ordering: callers order explicitly so unqualified
+        # queries don't sort the whole table.
+        indexes = [
+            # Keyset pagination of one conversation walks this index range
+            models.Index(fields=['student_lead', 'supervisor', 'created_at', 'id'], name='chat_thread_cursor_idx'),
+            # Delta sync reads everything touched after a watermark
+            models.Index(fields=['student_lead', 'supervisor', 'modified_at'], name='chat_thread_modified_idx'),
+        ]
+
+
+
+class ChatEvent(models.Model):
+    # Short-lived event log used by chat.broker.DatabaseBroker to relay
+    # messages between worker processes.
+    channel = models.CharField(max_length=64, db_index=True)
+    origin = models.CharField(max_length=32)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
+
+class ChatArchive(models.Model):
+    # Messages older than CHAT_ARCHIVE_AFTER_DAYS, moved out of chat_chatmessage
+    # by chat.archive.archive_messages. One row per conversation and calendar
+    # month holding the serialized messages as zlib-compressed JSON, ordered by
+    # (created_at, id).
+    student_lead = models.ForeignKey(StudentLead, on_delete=models.CASCADE, related_name='+')
+    supervisor = models.ForeignKey(Supervisor, on_delete=models.CASCADE, related_name='+')
+    period = models.CharField(max_length=7)  # YYYY-MM
+    message_count = models.PositiveIntegerField(default=0)
+    oldest_at = models.DateTimeField()
+    newest_at = models.DateTimeField()
+    data = models.BinaryField()
+
+    class Meta:
+        unique_together = ('student_lead', 'supervisor', 'period')
+
+    def __str__(self):
+        return f"{self.student_lead_id} <-> {self.supervisor_id} ({self.period})"
+
+
+class ConversationSummary(models.Model):
+    # One row per student_lead/supervisor conversation, kept up to date in the
+    # same transaction as the messages so inboxes never scan chat_chatmessage.
+    student_lead = models.ForeignKey(StudentLead, on_delete=models.CASCADE, related_name='conversations')
+    supervisor = models.ForeignKey(Supervisor, related_name='conversations', on_delete=models.CASCADE)
+    last_message = models.ForeignKey(ChatMessage, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_activity_at = models.DateTimeField()
+    student_unread = models.PositiveIntegerField(default=0)
+    supervisor_unread = models.PositiveIntegerField(default=0)
+    # Read receipts as per-participant high-watermarks: everything up to
+    # *_last_read_id has been seen. Only ever moves forward.
+    student_last_read_id = models.BigIntegerField(null=True, blank=True)
+    student_last_read_at = models.DateTimeField(null=True, blank=True)
+    supervisor_last_read_id = models.BigIntegerField(null=True, blank=True)
+    supervisor_last_read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('student_lead', 'supervisor')
+        indexes = [
+            models.Index(fields=['supervisor', '-last_activity_at'], name='chat_summary_inbox_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_lead_id} <-> {self.supervisor_id}"
+
+    @classmethod
+    def record_messages(cls, messages):
+        """
+        Fold newly created messages into their conversation summaries. Must run
+        inside the transaction that created the messages.
+        """
+        threads = {}
+        for message in messages:
+            threads.setdefault((message.student_lead_id, message.supervisor_id), []).append(message)
+
+        for (student_lead_id, supervisor_id), thread_messages in threads.items():
+            last_message = max(thread_messages, key=lambda message: (message.created_at, message.id))
+            summary, _ = cls.objects.get_or_create(
+                student_lead_id=student_lead_id,
+                supervisor_id=supervisor_id,
+                defaults={'last_activity_at': last_message.created_at},
+            )
+            changes = {
+                'last_message': last_message,
+                'last_activity_at': last_message.created_at,
+            }
+            for side, participant_id in (('student', student_lead_id), ('supervisor', supervisor_id)):
+                changes.update(cls._read_state(thread_messages, participant_id, side))
+            cls.objects.filter(pk=summary.pk).update(**changes)
+            conversation_changed.send(sender=cls, student_lead_id=student_lead_id, supervisor_id=supervisor_id)
+
+    @staticmethod
+    def _read_state(messages, participant_id, side):
+        # A participant who writes has read the thread: their watermark moves
+        # to their own latest message and the unread counter restarts from
+        # what came in after it.
+        unread = 0
+        last_sent = None
+        for message in sorted(messages, key=lambda message: (message.created_at, message.id)):
+            if message.user_id == participant_id:
+                unread = 0
+                last_sent = message
+            else:
+                unread += 1
+        if last_sent is None:
+            return {f'{side}_unread': F(f'{side}_unread') + unread}
+        return {
+            f'{side}_unread': unread,
+            f'{side}_last_read_id': last_sent.id,
+            f'{side}_last_read_at': last_sent.created_at,
+        }
+
+    @classmethod
+    def mark_read(cls, student_lead_id, supervisor_id, participant_id, message_id):
+        """
+        Advance `participant_id`'s read watermark to `message_id` with a single
+        conditional UPDATE, recomputing their unread count in the same
+        statement. Never moves a watermark backwards and only accepts ids of
+        messages in this conversation. Returns True if the watermark moved.
+        """
+        side = 'supervisor' if participant_id == supervisor_id else 'student'
+        thread = ChatMessage.objects.filter(student_lead_id=student_lead_id, supervisor_id=supervisor_id)
+        unread = thread.filter(id__gt=message_id).exclude(user_id=participant_id).order_by().values(
+            'student_lead_id'
+        ).annotate(count=Count('id')).values('count')
+
+        updated = bool(cls.objects.filter(
+            Q(**{f'{side}_last_read_id__isnull': True}) | Q(**{f'{side}_last_read_id__lt': message_id}),
+            Exists(thread.filter(id=message_id)),
+            student_lead_id=student_lead_id,
+            supervisor_id=supervisor_id,
+        ).update(**{
+            f'{side}_last_read_id': message_id,
+            f'{side}_last_read_at': timezone.now(),
+            f'{side}_unread': Coalesce(Subquery(unread), Value(0)),
+        }))
+        if updated:
+            conversation_changed.send(sender=cls, student_lead_id=student_lead_id, supervisor_id=supervisor_id)
+        return updated
+
+    def read_state(self):
+        return {
+            'student_lead': {'last_read_id': self.student_last_read_id, 'last_read_at': self.student_last_read_at},
+            'supervisor': {'last_read_id': self.supervisor_last_read_id, 'last_read_at': self.supervisor_last_read_at},
+        }
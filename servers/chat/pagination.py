@@ -0,0 +1,110 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at, message_id):
+    # Opaque cursor over the (created_at, id) keyset of a message
+    raw = f"{created_at.isoformat()}|{message_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, message_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(message_id)
+    except (ValueError, UnicodeError, binascii.Error):
+        raise ValidationError({'cursor': 'Invalid cursor.'})
+
+
+def get_page_size(request):
+    limit = request.query_params.get('limit')
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValidationError({'limit': 'A positive integer is required.'})
+    if limit < 1:
+        raise ValidationError({'limit': 'A positive integer is required.'})
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def is_paginated_request(request):
+    params = request.query_params
+    return any(key in params for key in ('limit', 'before', 'after'))
+
+
+def get_page_params(request):
+    """Returns (before, after, limit) with cursors decoded to (created_at, id) keys."""
+    before = request.query_params.get('before')
+    after = request.query_params.get('after')
+    if before and after:
+        raise ValidationError({'cursor': 'Use either "before" or "after", not both.'})
+    return (
+        decode_cursor(before) if before else None,
+        decode_cursor(after) if after else None,
+        get_page_size(request),
+    )
+
+
+def older_than(key):
+    created_at, message_id = key
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=message_id)
+
+
+def newer_than(key):
+    created_at, message_id = key
+    return Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=message_id)
+
+
+def build_page(rows, limit, before, after, key):
+    """
+    Trim rows fetched with limit + 1 to a page and compute its cursors. Rows
+    come newest first when walking back and oldest first with `after`; `key`
+    maps a row to its (created_at, id).
+    """
+    has_more = len(rows) > limit
+    if after:
+        page = rows[:limit]
+        edge = encode_cursor(*after)
+        return page, {
+            'older': encode_cursor(*key(page[0])) if page else edge,
+            'newer': encode_cursor(*key(page[-1])) if page else edge,
+            'has_more': has_more,
+        }
+
+    page = rows[:limit][::-1]
+    return page, {
+        'older': encode_cursor(*key(page[0])) if page and has_more else None,
+        'newer': encode_cursor(*key(page[-1])) if page else (encode_cursor(*before) if before else None),
+        'has_more': has_more,
+    }
+
+
+def paginate_thread(queryset, request):
+    """
+    Keyset pagination over a single conversation ordered by (created_at, id).
+
+    `?before=<cursor>` walks back into older history, `?after=<cursor>` returns
+    messages newer than the cursor and no cursor returns the latest page.
+    Messages are always returned oldest first. Returns (messages, page_info).
+    """
+    before, after, limit = get_page_params(request)
+
+    if after:
+        rows = list(queryset.filter(newer_than(after)).order_by('created_at', 'id')[:limit + 1])
+    else:
+        if before:
+            queryset = queryset.filter(older_than(before))
+        rows = list(queryset.order_by('-created_at', '-id')[:limit + 1])
+
+    return build_page(rows, limit, before, after, lambda message: (message.created_at, message.id))
@@ -0,0 +1,98 @@
+import re
+
+from django.db import connection
+from rest_framework.exceptions import ValidationError
+
+from .models import ChatMessage
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+SNIPPET_START = '<mark>'
+SNIPPET_END = '</mark>'
+
+
+def _sqlite_match(query):
+    # Quote every term so user input can never be parsed as FTS5 syntax;
+    # the last term is a prefix so results show up while typing.
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return None
+    quoted = ['"%s"' % term for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _sqlite_search(query, scope_sql, scope_params, limit, offset):
+    match = _sqlite_match(query)
+    if match is None:
+        return 0, []
+    where = f"chat_chatmessage_fts MATCH %s AND {scope_sql}"
+    params = [match, *scope_params]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM chat_chatmessage_fts "
+            "JOIN chat_chatmessage m ON m.id = chat_chatmessage_fts.rowid "
+            f"WHERE {where}",
+            params,
+        )
+        total = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT m.id, -bm25(chat_chatmessage_fts) AS rank, "
+            "snippet(chat_chatmessage_fts, 0, %s, %s, '...', 12) "
+            "FROM chat_chatmessage_fts "
+            "JOIN chat_chatmessage m ON m.id = chat_chatmessage_fts.rowid "
+            f"WHERE {where} ORDER BY bm25(chat_chatmessage_fts), m.id DESC LIMIT %s OFFSET %s",
+            [SNIPPET_START, SNIPPET_END, *params, limit, offset],
+        )
+        return total, cursor.fetchall()
+
+
+def _postgres_search(query, scope_sql, scope_params, limit, offset):
+    # The to_tsvector expression must match the chat_chatmessage_content_fts index
+    where = f"to_tsvector('english', m.content) @@ q AND {scope_sql}"
+    source = "FROM chat_chatmessage m, websearch_to_tsquery('english', %s) q "
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) {source} WHERE {where}", [query, *scope_params])
+        total = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT m.id, ts_rank(to_tsvector('english', m.content), q) AS rank, "
+            "ts_headline('english', m.content, q, %s) "
+            f"{source} WHERE {where} ORDER BY rank DESC, m.id DESC LIMIT %s OFFSET %s",
+            [f"StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, MaxWords=20, MinWords=5",
+             query, *scope_params, limit, offset],
+        )
+        return total, cursor.fetchall()
+
+
+BACKENDS = {
+    'sqlite': _sqlite_search,
+    'postgresql': _postgres_search,
+}
+
+
+def search_messages(query, user, student_lead_id=None, page=1, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Ranked full-text search over the chat messages visible to `user`.
+
+    Supervisors search across all of their conversations (optionally one
+    student lead's), students across their own. Returns (total, hits) where
+    every hit is (message, rank, snippet) in rank order.
+    """
+    backend = BACKENDS.get(connection.vendor)
+    if backend is None:
+        raise ValidationError({'q': f'Search is not supported on {connection.vendor}.'})
+
+    if user.role == 'supervisor':
+        scope_sql, scope_params = "m.supervisor_id = %s", [user.id]
+        if student_lead_id is not None:
+            scope_sql += " AND m.student_lead_id = %s"
+            scope_params.append(student_lead_id)
+    else:
+        scope_sql, scope_params = "m.student_lead_id = %s", [user.id]
+
+    total, rows = backend(query, scope_sql, scope_params, page_size, (page - 1) * page_size)
+
+    messages = ChatMessage.objects.select_related('user').in_bulk([row[0] for row in rows])
+    hits = [(messages[message_id], rank, snippet) for message_id, rank, snippet in rows if message_id in messages]
+    return total, hits
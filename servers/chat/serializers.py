@@ -13,12 +13,14 @@ from .models import ChatMessage
 
 
 
+from django.db import transaction
 from rest_framework import serializers
+from userAuthe.fieldsets import DynamicFieldsMixin
 from userAuthe.models import StudentProject, StudentLead, Supervisor
 from userAuthe.serializers import UserSerializer
-from .models import ChatMessage
+from .models import ChatMessage, ConversationSummary
 
-class ChatMessageSerializer(serializers.ModelSerializer):
+class ChatMessageSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)  
 
     student_lead = serializers.PrimaryKeyRelatedField(queryset=StudentLead.objects.all())
@@ -32,10 +34,43 @@ class ChatMessageSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         user = self.context['request'].user  # Access the user from the request in the context
 
-        chat_message = ChatMessage.objects.create(
-            user=user,
-            student_lead=validated_data.get('student_lead'),
-            supervisor=validated_data.get('supervisor'),
-            content=validated_data.get('content'),
-        )
+        with transaction.atomic():
+            chat_message = ChatMessage.objects.create(
+                user=user,
+                student_lead=validated_data.get('student_lead'),
+                supervisor=validated_data.get('supervisor'),
+                content=validated_data.get('content'),
+            )
+            ConversationSummary.record_messages([chat_message])
         return chat_message
+
+
+class ConversationSummarySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    student_lead = serializers.SerializerMethodField()
+    last_message = ChatMessageSerializer(read_only=True)
+    unread = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ConversationSummary
+        fields = ['id', 'student_lead', 'supervisor', 'last_message', 'last_activity_at',
+                  'student_unread', 'supervisor_unread', 'unread',
+                  'student_last_read_id', 'student_last_read_at',
+                  'supervisor_last_read_id', 'supervisor_last_read_at']
+
+    method_field_sources = {
+        'student_lead': ['student_lead'],
+        'unread': ['supervisor_id', 'student_unread', 'supervisor_unread'],
+    }
+
+    def get_student_lead(self, obj):
+        return {
+            'user_id': obj.student_lead.user_id,
+            'first_name': obj.student_lead.first_name,
+            'last_name': obj.student_lead.last_name,
+            'programme': obj.student_lead.programme,
+        }
+
+    def get_unread(self, obj):
+        # Unread count from the point of view of the requesting participant
+        user = self.context['request'].user
+        return obj.supervisor_unread if user.id == obj.supervisor_id else obj.student_unread
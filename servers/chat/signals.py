@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+
+# Sent with student_lead_id and supervisor_id when a conversation's summary
+# changes through a write that sends no model signals (recording new messages,
+# read receipts, archiving), from inside the writing transaction.
+conversation_changed = Signal()
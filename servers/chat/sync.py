@@ -0,0 +1,123 @@
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .broker import get_broker
+from .pagination import decode_cursor, encode_cursor
+
+
+MAX_DELTA_SIZE = 200
+EPOCH = (datetime(1970, 1, 1, tzinfo=dt_timezone.utc), 0)
+
+# Long-polls each process holds a thread for; further ones are answered at once
+_waiters = threading.BoundedSemaphore(settings.CHAT_LONG_POLL_MAX_WAITERS)
+
+
+def parse_watermark(value):
+    """
+    A (modified_at, id) watermark from an opaque value returned by the
+    endpoint, or (datetime, None) for a plain ISO 8601 datetime. No watermark
+    means the client has nothing yet: the whole conversation is replayed.
+    """
+    if not value:
+        return EPOCH
+    # A literal "+" in the UTC offset arrives as a space when not url-encoded
+    try:
+        modified_at = parse_datetime(value.replace(' ', '+'))
+    except ValueError:
+        modified_at = None
+    if modified_at is None:
+        try:
+            modified_at, message_id = decode_cursor(value)
+        except ValidationError:
+            raise ValidationError({'watermark': 'Expected a watermark or an ISO 8601 datetime.'})
+    else:
+        message_id = None
+    if timezone.is_naive(modified_at):
+        modified_at = timezone.make_aware(modified_at, dt_timezone.utc)
+    return modified_at, message_id
+
+
+def encode_watermark(watermark):
+    modified_at, message_id = watermark
+    if message_id is None:
+        return modified_at.isoformat()
+    return encode_cursor(modified_at, message_id)
+
+
+def parse_wait(value):
+    if not value:
+        return 0
+    try:
+        wait = float(value)
+    except ValueError:
+        raise ValidationError({'wait': 'Expected a number of seconds.'})
+    return max(0, min(wait, settings.CHAT_LONG_POLL_TIMEOUT))
+
+
+def changed_after(watermark):
+    # Past the (modified_at, id) keyset position; the range on modified_at keeps it on the index.
+    # Rows sharing the watermark's timestamp are told apart by id, so a page cut between them loses none.
+    modified_at, message_id = watermark
+    if message_id is None:
+        return Q(modified_at__gt=modified_at)
+    return Q(modified_at__gte=modified_at) & (Q(modified_at__gt=modified_at) | Q(id__gt=message_id))
+
+
+def fetch_delta(queryset, watermark):
+    """
+    Messages of a conversation created or edited after `watermark`, oldest
+    change first. Returns (messages, new_watermark, has_more).
+    """
+    rows = list(
+        queryset.filter(changed_after(watermark)).order_by('modified_at', 'id')[:MAX_DELTA_SIZE + 1]
+    )
+    messages = rows[:MAX_DELTA_SIZE]
+    new_watermark = (messages[-1].modified_at, messages[-1].id) if messages else watermark
+    return messages, new_watermark, len(rows) > MAX_DELTA_SIZE
+
+
+def wait_for_delta(queryset, watermark, wait, channel):
+    """
+    Long-poll variant of `fetch_delta`. Sleeps until the broker announces a
+    message on `channel` or `wait` seconds have passed, re-checking the
+    database every CHAT_LONG_POLL_INTERVAL seconds for changes the broker
+    cannot see (e.g. edits or another process with an in-process broker).
+
+    Each waiting request holds a worker thread, so at most
+    CHAT_LONG_POLL_MAX_WAITERS wait at a time per process; beyond that the
+    delta is returned straight away and the client simply polls again.
+    """
+    if not _waiters.acquire(blocking=False):
+        return fetch_delta(queryset, watermark)
+    try:
+        return _wait(queryset, watermark, wait, channel)
+    finally:
+        _waiters.release()
+
+
+def _wait(queryset, watermark, wait, channel):
+    changed = threading.Event()
+
+    def wake(payload):
+        changed.set()
+
+    broker = get_broker()
+    broker.subscribe(channel, wake)
+    try:
+        deadline = time.monotonic() + wait
+        while True:
+            changed.clear()
+            messages, new_watermark, has_more = fetch_delta(queryset, watermark)
+            remaining = deadline - time.monotonic()
+            if messages or remaining <= 0:
+                return messages, new_watermark, has_more
+            changed.wait(min(settings.CHAT_LONG_POLL_INTERVAL, remaining))
+    finally:
+        broker.unsubscribe(channel, wake)
@@ -1,3 +1,445 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import threading
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from userAuthe.compiled import compiled_serializer
+from userAuthe.factories import make_student_lead, make_supervisor
+from userAuthe.models import User
+from .archive import archive_messages
+from .broker import DatabaseBroker, InProcessBroker, channel_name, publish_messages
+from .consumers import CLOSE_FORBIDDEN, CLOSE_UNAUTHORIZED, chat_socket
+from .models import ChatArchive, ChatMessage
+from .pagination import encode_cursor
+from .serializers import ChatMessageSerializer
+from .sync import MAX_DELTA_SIZE
+
+
+class CompiledChatMessageSerializerTests(TestCase):
+
+    def setUp(self):
+        self.supervisor = make_supervisor()
+        self.student_lead = make_student_lead(self.supervisor, email='s@example.com')
+        student_user, supervisor_user = self.student_lead.user, self.supervisor.user
+        for index, user in enumerate([student_user, supervisor_user, None, student_user]):
+            ChatMessage.objects.create(
+                user=user, student_lead=self.student_lead, supervisor=self.supervisor, content=f'message {index}'
+            )
+
+    def assertParity(self, path=''):
+        request = Request(APIRequestFactory().get('/' + path))
+        queryset = ChatMessage.objects.order_by('created_at', 'id')
+        expected = ChatMessageSerializer(queryset, many=True, context={'request': request}).data
+        compiled = compiled_serializer(ChatMessageSerializer, request).serialize(queryset, request)
+        self.assertEqual(JSONRenderer().render(compiled), JSONRenderer().render(expected))
+
+    def test_parity(self):
+        self.assertParity()
+
+    def test_parity_with_fieldsets(self):
+        self.assertParity('?fields=id,content,user')
+        self.assertParity('?fields=content,user.username')
+        self.assertParity('?expand=user')
+
+    def test_thread_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.student_lead.user)
+        response = client.get(f'/chat/chat_messages/{self.student_lead.pk}/{self.supervisor.pk}/')
+        queryset = ChatMessage.objects.order_by('created_at', 'id')
+        self.assertEqual(response.content, JSONRenderer().render(ChatMessageSerializer(queryset, many=True).data))
+
+    def test_thread_endpoint_is_limited_to_participants(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='outsider'))
+        path = f'/chat/chat_messages/{self.student_lead.pk}/{self.supervisor.pk}/'
+        self.assertEqual(client.get(path).status_code, 403)
+        self.assertEqual(client.get(path, {'limit': 10}).status_code, 403)
+        self.assertEqual(APIClient().get(path).status_code, 401)
+
+
+class ChatPaginationTests(TestCase):
+
+    def setUp(self):
+        self.supervisor = make_supervisor()
+        self.student_lead = make_student_lead(self.supervisor)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student_lead.user)
+        self.path = f'/chat/chat_messages/{self.student_lead.pk}/{self.supervisor.pk}/'
+        # Seven messages, the middle three sharing one timestamp so that page cuts fall inside the tie
+        start = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        self.ids = []
+        for minutes in (0, 1, 2, 2, 2, 3, 4):
+            message = ChatMessage.objects.create(student_lead=self.student_lead, supervisor=self.supervisor, content='m')
+            ChatMessage.objects.filter(pk=message.pk).update(created_at=start + timedelta(minutes=minutes))
+            self.ids.append(message.id)
+
+    def get(self, **params):
+        response = self.client.get(self.path, params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return data, [item['id'] for item in data['results']]
+
+    def test_before_walks_back_through_the_history(self):
+        data, ids = self.get(limit=2)
+        self.assertEqual(ids, self.ids[5:])
+        pages = [ids]
+        while data['has_more']:
+            data, ids = self.get(limit=2, before=data['older'])
+            pages.append(ids)
+        self.assertEqual(pages, [self.ids[5:], self.ids[3:5], self.ids[1:3], self.ids[:1]])
+        self.assertIsNone(data['older'])
+
+    def test_after_walks_forward_and_cursors_mark_the_page_edges(self):
+        message = ChatMessage.objects.get(pk=self.ids[0])
+        data, ids = self.get(limit=2, after=encode_cursor(message.created_at, message.id))
+        self.assertEqual(ids, self.ids[1:3])
+        self.assertTrue(data['has_more'])
+        first = ChatMessage.objects.get(pk=ids[0])
+        self.assertEqual(data['older'], encode_cursor(first.created_at, first.id))
+
+        pages = [ids]
+        while data['has_more']:
+            data, ids = self.get(limit=2, after=data['newer'])
+            pages.append(ids)
+        self.assertEqual(pages, [self.ids[1:3], self.ids[3:5], self.ids[5:]])
+
+        # Caught up: nothing newer, and the cursor stays put for the next poll
+        cursor = data['newer']
+        data, ids = self.get(limit=2, after=cursor)
+        self.assertEqual((ids, data['newer'], data['has_more']), ([], cursor, False))
+
+    def test_invalid_cursors_and_limits_are_rejected(self):
+        self.assertEqual(self.client.get(self.path, {'before': 'not-a-cursor'}).status_code, 400)
+        self.assertEqual(self.client.get(self.path, {'limit': 0}).status_code, 400)
+        cursor = encode_cursor(timezone.now(), 1)
+        self.assertEqual(self.client.get(self.path, {'before': cursor, 'after': cursor}).status_code, 400)
+
+
+class ChatDeltaSyncTests(TestCase):
+
+    def setUp(self):
+        self.supervisor = make_supervisor()
+        self.student_lead = make_student_lead(self.supervisor)
+        self.client = APIClient()
+        self.client.force_authenticate(self.student_lead.user)
+        self.path = f'/chat/chat_messages/{self.student_lead.pk}/{self.supervisor.pk}/since/'
+
+    def test_rows_sharing_a_timestamp_survive_a_page_cut(self):
+        ChatMessage.objects.bulk_create([
+            ChatMessage(student_lead=self.student_lead, supervisor=self.supervisor, content=str(index))
+            for index in range(MAX_DELTA_SIZE + 5)
+        ])
+        ChatMessage.objects.update(modified_at=timezone.now())
+
+        first = self.client.get(self.path, {'watermark': (timezone.now() - timedelta(days=1)).isoformat()}).json()
+        self.assertEqual(len(first['results']), MAX_DELTA_SIZE)
+        self.assertTrue(first['has_more'])
+        second = self.client.get(self.path, {'watermark': first['watermark']}).json()
+        self.assertEqual(len(second['results']), 5)
+        self.assertFalse(second['has_more'])
+        ids = [item['id'] for item in first['results'] + second['results']]
+        self.assertEqual(ids, sorted(ChatMessage.objects.values_list('id', flat=True)))
+
+    def test_first_messages_of_an_empty_conversation_are_not_skipped(self):
+        first = self.client.get(self.path).json()
+        self.assertEqual(first['results'], [])
+        self.assertIsNotNone(first['watermark'])
+        message = ChatMessage.objects.create(student_lead=self.student_lead, supervisor=self.supervisor, content='hi')
+        second = self.client.get(self.path, {'watermark': first['watermark']}).json()
+        self.assertEqual([item['id'] for item in second['results']], [message.id])
+        # A client that never stored a watermark gets the whole conversation
+        self.assertEqual([item['id'] for item in self.client.get(self.path).json()['results']], [message.id])
+        self.assertEqual(self.client.get(self.path, {'watermark': second['watermark']}).json()['results'], [])
+
+    def test_only_participants_may_sync(self):
+        self.client.force_authenticate(User.objects.create_user(username='outsider'))
+        self.assertEqual(self.client.get(self.path, {'wait': 5}).status_code, 403)
+
+    def test_long_poll_answers_at_once_when_no_waiter_slot_is_free(self):
+        with mock.patch('chat.sync._waiters', threading.BoundedSemaphore(1)) as waiters:
+            waiters.acquire()
+            response = self.client.get(self.path, {'watermark': timezone.now().isoformat(), 'wait': 20})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
+
+
+class ChatBulkIngestTests(TestCase):
+
+    def setUp(self):
+        self.supervisor = make_supervisor()
+        self.student_lead = make_student_lead(self.supervisor)
+        self.student = self.student_lead.user
+        self.other = make_student_lead(self.supervisor, username='other')
+        self.client = APIClient()
+
+    def post(self, user, messages):
+        self.client.force_authenticate(user)
+        return self.client.post('/chat/chat_messages/bulk/', {'messages': messages}, format='json')
+
+    def test_only_the_senders_conversations_are_written(self):
+        own = {'student_lead': self.student_lead.pk, 'supervisor': self.supervisor.pk, 'content': 'mine'}
+        foreign = {'student_lead': self.other.pk, 'supervisor': self.supervisor.pk, 'content': 'not mine'}
+        response = self.post(self.student, [own, foreign])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([result['status'] for result in response.json()['results']], ['created', 'forbidden'])
+        self.assertEqual(list(ChatMessage.objects.values_list('content', flat=True)), ['mine'])
+
+    def test_outsiders_cannot_write_anywhere(self):
+        outsider = User.objects.create_user(username='outsider')
+        message = {'student_lead': self.student_lead.pk, 'supervisor': self.supervisor.pk, 'content': 'hi'}
+        response = self.post(outsider, [message])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['results'][0]['status'], 'forbidden')
+        self.assertFalse(ChatMessage.objects.exists())
+
+
+class ChatSearchTests(TestCase):
+
+    def setUp(self):
+        self.supervisor = make_supervisor()
+        self.first = make_student_lead(self.supervisor, username='first')
+        self.second = make_student_lead(self.supervisor, username='second')
+        self.outsider = make_supervisor(username='outsider').user
+
+    def message(self, student_lead, content):
+        return ChatMessage.objects.create(student_lead=student_lead, supervisor=self.supervisor, content=content)
+
+    def search(self, user, query, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/chat/search/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def ids(self, user, query, **params):
+        return [hit['id'] for hit in self.search(user, query, **params)['results']]
+
+    def test_index_follows_inserts_edits_and_deletes(self):
+        message = self.message(self.first, 'quantum widgets')
+        self.assertEqual(self.ids(self.first.user, 'quantum'), [message.id])
+
+        message.content = 'classical gadgets'
+        message.save()
+        self.assertEqual(self.ids(self.first.user, 'quantum'), [])
+        self.assertEqual(self.ids(self.first.user, 'classical'), [message.id])
+
+        message.delete()
+        self.assertEqual(self.ids(self.first.user, 'classical'), [])
+
+    def test_hits_are_limited_to_the_callers_conversations(self):
+        first = self.message(self.first, 'draft chapter two')
+        second = self.message(self.second, 'draft chapter three')
+
+        self.assertEqual(self.ids(self.first.user, 'draft'), [first.id])
+        self.assertEqual(self.ids(self.second.user, 'draft'), [second.id])
+        self.assertEqual(sorted(self.ids(self.supervisor.user, 'draft')), [first.id, second.id])
+        self.assertEqual(self.ids(self.supervisor.user, 'draft', student_lead=self.second.pk), [second.id])
+        self.assertEqual(self.search(self.outsider, 'draft'), {'count': 0, 'page': 1, 'page_size': 20, 'results': []})
+
+    def test_ranking_and_snippets(self):
+        sparse = self.message(self.first, 'the thesis is due after the long holiday break next month')
+        dense = self.message(self.first, 'thesis thesis thesis')
+
+        data = self.search(self.first.user, 'thes')  # the last term matches as a prefix
+        self.assertEqual(data['count'], 2)
+        self.assertEqual([hit['id'] for hit in data['results']], [dense.id, sparse.id])
+        self.assertGreater(data['results'][0]['rank'], data['results'][1]['rank'])
+        self.assertIn('<mark>thesis</mark> is due', data['results'][1]['snippet'])
+
+        paged = self.search(self.first.user, 'thesis', page=2, page_size=1)
+        self.assertEqual((paged['count'], [hit['id'] for hit in paged['results']]), (2, [sparse.id]))
+
+
+class ChatArchiveTests(TestCase):
+
+    def setUp(self):
+        self.supervisor = make_supervisor()
+        self.student_lead = make_student_lead(self.supervisor)
+        self.student = self.student_lead.user
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.path = f'/chat/chat_messages/{self.student_lead.pk}/{self.supervisor.pk}/'
+        self.ids = [
+            self.message(f'message {index}', created_at).id for index, created_at in enumerate([
+                datetime(2020, 1, 10, tzinfo=dt_timezone.utc),
+                datetime(2020, 1, 20, tzinfo=dt_timezone.utc),
+                datetime(2020, 2, 5, tzinfo=dt_timezone.utc),
+                timezone.now() - timedelta(days=1),
+                timezone.now(),
+            ])
+        ]
+
+    def message(self, content, created_at):
+        message = ChatMessage.objects.create(student_lead=self.student_lead, supervisor=self.supervisor, content=content)
+        ChatMessage.objects.filter(pk=message.pk).update(created_at=created_at)
+        return message
+
+    def archived(self):
+        return {
+            archive.period: [item['id'] for item in json.loads(zlib.decompress(archive.data))]
+            for archive in ChatArchive.objects.order_by('period')
+        }
+
+    def test_old_messages_are_compressed_into_monthly_archives_and_deleted(self):
+        call_command('archive_chat_messages', days=30, batch_size=2, stdout=io.StringIO())
+        self.assertEqual(self.archived(), {'2020-01': self.ids[:2], '2020-02': [self.ids[2]]})
+        self.assertEqual(list(ChatMessage.objects.order_by('id').values_list('id', flat=True)), self.ids[3:])
+
+        # A later run merges into the month's archive, keeping it in order
+        late = self.message('late', datetime(2020, 1, 15, tzinfo=dt_timezone.utc))
+        self.assertEqual(archive_messages(older_than_days=30), 1)
+        self.assertEqual(self.archived()['2020-01'], [self.ids[0], late.id, self.ids[1]])
+        self.assertEqual(ChatArchive.objects.get(period='2020-01').message_count, 3)
+
+    def test_include_archived_reads_the_whole_thread(self):
+        archive_messages(older_than_days=30)
+        self.assertEqual([item['id'] for item in self.client.get(self.path).json()], self.ids[3:])
+        data = self.client.get(self.path, {'include_archived': 'true'}).json()
+        self.assertEqual([item['id'] for item in data], self.ids)
+        self.assertEqual(data[0]['content'], 'message 0')
+
+    def test_include_archived_pages_cross_into_the_archive(self):
+        archive_messages(older_than_days=30)
+        params = {'include_archived': 'true', 'limit': 2}
+
+        pages, page = [], self.client.get(self.path, params).json()
+        pages.append(page)
+        while page['has_more']:
+            page = self.client.get(self.path, {**params, 'before': page['older']}).json()
+            pages.append(page)
+        self.assertEqual([[item['id'] for item in page['results']] for page in pages],
+                         [self.ids[3:], self.ids[1:3], self.ids[:1]])
+
+        forward, cursor = [], encode_cursor(datetime(2000, 1, 1, tzinfo=dt_timezone.utc), 0)
+        while True:
+            page = self.client.get(self.path, {**params, 'after': cursor}).json()
+            if not page['results']:
+                break
+            forward += [item['id'] for item in page['results']]
+            cursor = page['newer']
+        self.assertEqual(forward, self.ids)
+
+
+class ChatSocketTests(TestCase):
+
+    def setUp(self):
+        self.supervisor = make_supervisor()
+        self.student_lead = make_student_lead(self.supervisor)
+        self.student = self.student_lead.user
+        self.broker = InProcessBroker()
+        self.channel = channel_name(self.student_lead.pk, self.supervisor.pk)
+
+    def connect(self, token=None, payload=None):
+        # Drive the ASGI app: connect, publish `payload` once subscribed, leave after the first frame
+        path = f'/ws/chat/{self.student_lead.pk}/{self.supervisor.pk}/'
+        scope = {'type': 'websocket', 'path': path, 'query_string': f'token={token}'.encode() if token else b''}
+        sent = []
+
+        async def run():
+            frame = asyncio.Event()
+            calls = []
+
+            async def receive():
+                calls.append(None)
+                if len(calls) == 1:
+                    return {'type': 'websocket.connect'}
+                self.broker.publish(self.channel, payload)
+                await asyncio.wait_for(frame.wait(), 5)
+                return {'type': 'websocket.disconnect', 'code': 1000}
+
+            async def send(event):
+                sent.append(event)
+                if event['type'] == 'websocket.send':
+                    frame.set()
+
+            await chat_socket(scope, receive, send)
+
+        with mock.patch('chat.consumers.get_broker', return_value=self.broker):
+            async_to_sync(run)()
+        return sent
+
+    def test_missing_or_invalid_token_is_rejected(self):
+        self.assertEqual(self.connect(), [{'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED}])
+        self.assertEqual(self.connect('not-a-jwt'), [{'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED}])
+
+    def test_outsiders_are_rejected(self):
+        token = AccessToken.for_user(User.objects.create_user(username='outsider'))
+        self.assertEqual(self.connect(str(token)), [{'type': 'websocket.close', 'code': CLOSE_FORBIDDEN}])
+
+    def test_participant_receives_published_messages(self):
+        payload = {'type': 'chat.message', 'message': {'id': 1, 'content': 'hello'}}
+        sent = self.connect(str(AccessToken.for_user(self.student)), payload)
+        self.assertEqual(sent[0], {'type': 'websocket.accept'})
+        self.assertEqual(json.loads(sent[1]['text']), payload)
+        # Unsubscribed once the client left
+        self.assertEqual(self.broker._channels(), [])
+
+
+@override_settings(CHAT_BROKER_POLL_INTERVAL=0.01)
+class ChatBrokerTests(TransactionTestCase):
+
+    def setUp(self):
+        self.supervisor = make_supervisor()
+        self.student_lead = make_student_lead(self.supervisor)
+        self.channel = channel_name(self.student_lead.pk, self.supervisor.pk)
+
+    def subscribe(self, broker):
+        received, delivered = [], threading.Event()
+
+        def callback(payload):
+            received.append(payload)
+            delivered.set()
+
+        broker.subscribe(self.channel, callback)
+        self.addCleanup(broker.unsubscribe, self.channel, callback)
+        return received, delivered
+
+    def assertPublishedOnCommit(self, broker):
+        received, delivered = self.subscribe(broker)
+        with mock.patch('chat.broker._broker', broker):
+            with transaction.atomic():
+                message = ChatMessage.objects.create(
+                    student_lead=self.student_lead, supervisor=self.supervisor, content='hello'
+                )
+                publish_messages([message])
+                self.assertEqual(received, [])
+        self.assertTrue(delivered.wait(5))
+        self.assertEqual(received[0]['message']['id'], message.id)
+
+    def test_in_process_broker_publishes_on_commit(self):
+        self.assertPublishedOnCommit(InProcessBroker())
+
+    def test_database_broker_publishes_on_commit(self):
+        self.assertPublishedOnCommit(DatabaseBroker())
+
+    def test_nothing_is_published_on_rollback(self):
+        broker = InProcessBroker()
+        received, _ = self.subscribe(broker)
+        with mock.patch('chat.broker._broker', broker):
+            with transaction.atomic():
+                message = ChatMessage.objects.create(
+                    student_lead=self.student_lead, supervisor=self.supervisor, content='hello'
+                )
+                publish_messages([message])
+                transaction.set_rollback(True)
+        self.assertEqual(received, [])
+
+    def test_database_broker_relays_between_processes(self):
+        publisher, subscriber = DatabaseBroker(), DatabaseBroker()
+        received, delivered = self.subscribe(subscriber)
+        publisher.publish(self.channel, {'type': 'chat.message', 'message': {'id': 1}})
+        self.assertTrue(delivered.wait(5))
+        self.assertEqual(received, [{'type': 'chat.message', 'message': {'id': 1}}])
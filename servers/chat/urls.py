@@ -1,9 +1,14 @@
 
 
 from django.urls import path
-from .views import get_chat_messages, create_chat_message
+from .views import get_chat_messages, get_chat_messages_since, create_chat_message, create_chat_messages_bulk, get_inbox, search_chat_messages, mark_chat_read
 
 urlpatterns = [
     path('chat_messages/<int:student_lead_id>/<int:supervisor_id>/', get_chat_messages, name='get_chat_messages'),
+    path('chat_messages/<int:student_lead_id>/<int:supervisor_id>/since/', get_chat_messages_since, name='get_chat_messages_since'),
     path('chat_messages/create/', create_chat_message, name='create_chat_message'),
+    path('chat_messages/bulk/', create_chat_messages_bulk, name='create_chat_messages_bulk'),
+    path('inbox/', get_inbox, name='chat_inbox'),
+    path('read/<int:student_lead_id>/<int:supervisor_id>/', mark_chat_read, name='mark_chat_read'),
+    path('search/', search_chat_messages, name='search_chat_messages'),
 ]
\ No newline at end of file
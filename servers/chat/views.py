@@ -1,10 +1,20 @@
 
 
 from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from .serializers import ChatMessageSerializer
-from .models import ChatMessage
+from .serializers import ChatMessageSerializer, ConversationSummarySerializer
+from .models import ChatMessage, ConversationSummary
+from .pagination import is_paginated_request, paginate_thread
+from .archive import paginate_with_archive, thread_with_archive
+from .broker import channel_name, publish_messages
+from .bulk import MAX_BATCH_SIZE, ingest_messages
+from .search import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, search_messages
+from .sync import encode_watermark, fetch_delta, parse_wait, parse_watermark, wait_for_delta
+from userAuthe.compiled import compiled_serializer
+from userAuthe.fieldsets import prepare_queryset
+from userAuthe.pagination import positive_int_param
 
 @api_view(['POST'])
 def create_chat_message(request):
@@ -12,21 +22,196 @@ def create_chat_message(request):
         # Pass the request object in the context
         serializer = ChatMessageSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            serializer.save()  # Will call the create method
+            chat_message = serializer.save()  # Will call the create method
+            publish_messages([chat_message], [serializer.data])
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_chat_messages_bulk(request):
+    """
+    Batch variant of create_chat_message for transcript imports and offline
+    replay: {"messages": [{student_lead, supervisor, content}, ...]}.
+    """
+    items = request.data.get('messages') if isinstance(request.data, dict) else request.data
+    if not isinstance(items, list) or not items:
+        return Response({"error": "Expected a non-empty list of messages"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > MAX_BATCH_SIZE:
+        return Response({"error": f"At most {MAX_BATCH_SIZE} messages per batch"}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = ingest_messages(items, request.user)
+    created = sum(1 for result in results if result['status'] == 'created')
+    return Response(
+        {'created': created, 'failed': len(results) - created, 'results': results},
+        status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+    )
+
+
+def _read_state(request, student_lead_id, supervisor_id):
+    # Watermarks of both participants, read from the conversation summary
+    summary = ConversationSummary.objects.filter(
+        student_lead_id=student_lead_id, supervisor_id=supervisor_id
+    ).first()
+    if summary is None:
+        return {'read_state': None, 'unread': 0}
+    unread = summary.supervisor_unread if request.user.id == summary.supervisor_id else summary.student_unread
+    return {'read_state': summary.read_state(), 'unread': unread}
+
+
 @api_view(['GET'])
+@permission_classes([IsAuthenticated])
 def get_chat_messages(request, student_lead_id, supervisor_id):
+    if request.user.id not in (student_lead_id, supervisor_id):
+        return Response({"error": "You are not part of this conversation."}, status=status.HTTP_403_FORBIDDEN)
     try:
         # Filter messages by both student_lead and supervisor IDs
         chat_messages = ChatMessage.objects.filter(
             student_lead=student_lead_id,
             supervisor=supervisor_id
-        ).order_by('created_at')
+        )
+
+        # ?include_archived=true also reads history moved out by archive_chat_messages
+        include_archived = request.query_params.get('include_archived', '').lower() in ('1', 'true', 'yes')
+        if include_archived:
+            # Archived messages are stored serialized in full, so ?fields= doesn't apply
+            chat_messages = chat_messages.select_related('user')
+        else:
+            chat_messages = prepare_queryset(chat_messages, ChatMessageSerializer, request, also_load=['created_at'])
+
+        # ?limit=, ?before=<cursor> or ?after=<cursor> switch to keyset pages
+        if is_paginated_request(request):
+            if include_archived:
+                data, page_info = paginate_with_archive(chat_messages, request, student_lead_id, supervisor_id)
+            else:
+                messages, page_info = paginate_thread(chat_messages, request)
+                data = ChatMessageSerializer(messages, many=True, context={'request': request}).data
+            return Response(
+                {'results': data, **page_info, **_read_state(request, student_lead_id, supervisor_id)},
+                status=status.HTTP_200_OK
+            )
+
+        if include_archived:
+            data = thread_with_archive(chat_messages, student_lead_id, supervisor_id)
+            return Response(data, status=status.HTTP_200_OK)
 
-        serializer = ChatMessageSerializer(chat_messages, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Whole threads can be long: render them with the compiled serializer
+        chat_messages = chat_messages.order_by('created_at', 'id')
+        data = compiled_serializer(ChatMessageSerializer, request).serialize(chat_messages, request)
+        return Response(data, status=status.HTTP_200_OK)
     except ChatMessage.DoesNotExist:
         return Response({'detail': 'Chat messages not found for this conversation.'}, status=status.HTTP_404_NOT_FOUND)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_chat_messages_since(request, student_lead_id, supervisor_id):
+    """
+    Messages created or edited after ?watermark=<value returned by the previous
+    call, or an ISO datetime>; without one, every message from the start of
+    the conversation. With ?wait=<seconds> the request is held until
+    something changes or the timeout expires.
+    """
+    if request.user.id not in (student_lead_id, supervisor_id):
+        return Response({"error": "You are not part of this conversation."}, status=status.HTTP_403_FORBIDDEN)
+
+    watermark = parse_watermark(request.query_params.get('watermark'))
+    wait = parse_wait(request.query_params.get('wait'))
+
+    chat_messages = prepare_queryset(
+        ChatMessage.objects.filter(student_lead=student_lead_id, supervisor=supervisor_id),
+        ChatMessageSerializer, request, also_load=['created_at', 'modified_at']
+    )
+
+    if wait:
+        messages, watermark, has_more = wait_for_delta(
+            chat_messages, watermark, wait, channel_name(student_lead_id, supervisor_id)
+        )
+    else:
+        messages, watermark, has_more = fetch_delta(chat_messages, watermark)
+
+    serializer = ChatMessageSerializer(messages, many=True, context={'request': request})
+    return Response({
+        'results': serializer.data,
+        'watermark': encode_watermark(watermark),
+        'has_more': has_more,
+        **_read_state(request, student_lead_id, supervisor_id),
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_inbox(request):
+    """
+    The caller's conversations, most recently active first, with unread counts.
+    """
+    if request.user.role == 'supervisor':
+        summaries = ConversationSummary.objects.filter(supervisor_id=request.user.id)
+    else:
+        summaries = ConversationSummary.objects.filter(student_lead_id=request.user.id)
+
+    summaries = prepare_queryset(summaries, ConversationSummarySerializer, request).order_by('-last_activity_at')
+    serializer = ConversationSummarySerializer(summaries, many=True, context={'request': request})
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mark_chat_read(request, student_lead_id, supervisor_id):
+    """
+    Advance the caller's read watermark in a conversation to {"message_id": <id>},
+    or to the newest message when no id is given.
+    """
+    if request.user.id not in (student_lead_id, supervisor_id):
+        return Response({"error": "You are not part of this conversation."}, status=status.HTTP_403_FORBIDDEN)
+
+    message_id = request.data.get('message_id')
+    if message_id is None:
+        message_id = ChatMessage.objects.filter(
+            student_lead_id=student_lead_id, supervisor_id=supervisor_id
+        ).order_by('-id').values_list('id', flat=True).first()
+        if message_id is None:
+            return Response({'updated': False, **_read_state(request, student_lead_id, supervisor_id)})
+    try:
+        message_id = int(message_id)
+    except (TypeError, ValueError):
+        return Response({'message_id': 'A message id is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    updated = ConversationSummary.mark_read(student_lead_id, supervisor_id, request.user.id, message_id)
+    return Response(
+        {'updated': updated, **_read_state(request, student_lead_id, supervisor_id)},
+        status=status.HTTP_200_OK
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_chat_messages(request):
+    """
+    Full-text search across the caller's conversations: ?q=<terms>&page=&page_size=.
+    Supervisors may narrow the search to one student with ?student_lead=<id>.
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'q': 'A search query is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    page = positive_int_param(request, 'page', 1)
+    page_size = min(positive_int_param(request, 'page_size', DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE)
+    student_lead_id = request.query_params.get('student_lead')
+    if student_lead_id is not None:
+        student_lead_id = positive_int_param(request, 'student_lead', None)
+
+    total, hits = search_messages(query, request.user, student_lead_id, page, page_size)
+
+    results = []
+    data = ChatMessageSerializer([message for message, _, _ in hits], many=True).data
+    for item, (_, rank, snippet) in zip(data, hits):
+        results.append({**item, 'rank': rank, 'snippet': snippet})
+
+    return Response({
+        'count': total,
+        'page': page,
+        'page_size': page_size,
+        'results': results,
+    }, status=status.HTTP_200_OK)
@@ -0,0 +1,182 @@
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from userAuthe.dashboard import invalidate_dashboard
+from userAuthe.models import User
+from .models import ProjectParticipants
+from .serializers import ParticipantUserSerializer, ProjectParticipantsSerializer
+
+
+MAX_BATCH_SIZE = 1000
+INSERT_BATCH_SIZE = 500
+
+
+def validate_participants(items, seen_usernames=None):
+    """
+    Validate a batch of participant items. Returns (results, pending): one
+    result per invalid item, None for the others, and the valid items as
+    (index, data, account data or None). As when participants were added one
+    at a time, an item whose account can't be created (invalid or taken
+    username, the first use in the input wins) is still added, just without
+    an account. Pass the same `seen_usernames` set to validate consecutive
+    chunks of one input.
+    """
+    seen_usernames = set() if seen_usernames is None else seen_usernames
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = {'index': index, 'status': 'invalid', 'errors': {'non_field_errors': ["Expected an object."]}}
+            continue
+        serializer = ProjectParticipantsSerializer(data=item)
+        if not serializer.is_valid():
+            results[index] = {'index': index, 'status': 'invalid', 'errors': serializer.errors}
+            continue
+        user_serializer = ParticipantUserSerializer(data=item) if 'username' in item else None
+        account = user_serializer.validated_data if user_serializer is not None and user_serializer.is_valid() else None
+        valid.append((index, serializer.validated_data, account))
+
+    # Taken usernames for the whole batch in one query
+    usernames = {account['username'] for _, _, account in valid if account}
+    taken_usernames = set(User.objects.filter(username__in=usernames).values_list('username', flat=True)) if usernames else set()
+
+    pending = []
+    for index, data, account in valid:
+        if account:
+            if account['username'] in taken_usernames or account['username'] in seen_usernames:
+                account = None
+            else:
+                seen_usernames.add(account['username'])
+        pending.append((index, data, account))
+    return results, pending
+
+
+def insert_participants(pending, owner):
+    """Insert the `pending` items of validate_participants(); call inside a transaction."""
+    participants = [
+        ProjectParticipants(
+            user=owner,
+            first_name=data['first_name'],
+            last_name=data['last_name'],
+            admision_no=data['admision_no'],
+            programme=data['programme'],
+            mail=data.get('mail', ''),
+        )
+        for _, data, _ in pending
+    ]
+    users = [
+        User(username=account['username'], email=account.get('email', ''), role='student',
+             password=make_password(None))
+        for _, _, account in pending if account
+    ]
+    User.objects.bulk_create(users, batch_size=INSERT_BATCH_SIZE)
+    ProjectParticipants.objects.bulk_create(participants, batch_size=INSERT_BATCH_SIZE)
+    # bulk_create sends no post_save
+    transaction.on_commit(lambda: invalidate_dashboard(owner.pk))
+    return participants
+
+
+def add_participants(items, owner):
+    """
+    Validate and insert a batch of project participants owned by `owner`.
+
+    Returns (created, results): the number of participants inserted and one
+    result per input item, in order: {"index", "status": "created", "id"} or
+    {"index", "status": "invalid", "errors"}. All or nothing: if any item is
+    invalid, none are inserted and the others are reported as "valid". Items
+    with a free username also get a user account, created in the same
+    transaction.
+    """
+    results, pending = validate_participants(items)
+    if not pending or len(pending) < len(items):
+        for index, _, _ in pending:
+            results[index] = {'index': index, 'status': 'valid'}
+        return 0, results
+
+    with transaction.atomic():
+        participants = insert_participants(pending, owner)
+
+    for (index, _, _), participant in zip(pending, participants):
+        results[index] = {'index': index, 'status': 'created', 'id': participant.id}
+    return len(participants), results
+
+
+def _missing(ids, owner_message):
+    # Ids the owner's statement didn't match: someone else's, or not there
+    others = set(ProjectParticipants.objects.filter(id__in=ids).values_list('id', flat=True))
+    return {
+        id: {'id': id, 'status': 'forbidden', 'errors': {'non_field_errors': [owner_message]}} if id in others
+        else {'id': id, 'status': 'not_found', 'errors': {'non_field_errors': ["Project member not found."]}}
+        for id in ids
+    }
+
+
+def _member_id(value):
+    return value if isinstance(value, int) and not isinstance(value, bool) and value > 0 else None
+
+
+def update_participants(items, owner):
+    """
+    Apply partial changes [{"id", <fields>...}, ...] to members owned by
+    `owner` with one bulk_update. Returns one result per item, in order:
+    {"id", "status": "updated"} or {"id", "status": "invalid" | "forbidden" |
+    "not_found", "errors"}. Valid changes are applied even if others fail.
+    """
+    results = [None] * len(items)
+    changes = {}
+    for index, item in enumerate(items):
+        member_id = _member_id(item.get('id')) if isinstance(item, dict) else None
+        if member_id is None:
+            results[index] = {'id': item.get('id') if isinstance(item, dict) else None, 'status': 'invalid',
+                              'errors': {'id': ["A positive integer id is required."]}}
+            continue
+        if member_id in changes:
+            results[index] = {'id': member_id, 'status': 'invalid', 'errors': {'id': ["Id appears more than once in this input."]}}
+            continue
+        serializer = ProjectParticipantsSerializer(data={key: value for key, value in item.items() if key != 'id'}, partial=True)
+        if serializer.is_valid():
+            changes[member_id] = (index, serializer.validated_data)
+        else:
+            results[index] = {'id': member_id, 'status': 'invalid', 'errors': serializer.errors}
+
+    fields = sorted({field for _, data in changes.values() for field in data})
+    with transaction.atomic():
+        # Only the ids of the owner's rows are loaded; bulk_update writes the rest
+        members = list(ProjectParticipants.objects.filter(user=owner, id__in=changes).only('id'))
+        for member in members:
+            for field, value in changes[member.id][1].items():
+                setattr(member, field, value)
+        if members and fields:
+            ProjectParticipants.objects.bulk_update(members, fields, batch_size=INSERT_BATCH_SIZE)
+            # bulk_update sends no post_save
+            transaction.on_commit(lambda: invalidate_dashboard(owner.pk))
+
+    updated = {member.id for member in members}
+    missing = _missing(set(changes) - updated, "You do not have permission to update this member.")
+    for member_id, (index, _) in changes.items():
+        results[index] = {'id': member_id, 'status': 'updated'} if member_id in updated else missing[member_id]
+    return results
+
+
+def delete_participants(ids, owner):
+    """
+    Delete the members `ids` owned by `owner`, with the owner in the DELETE's
+    lookup. Returns one result per id, in order: {"id",
+    "status": "deleted"} or {"id", "status": "invalid" | "forbidden" |
+    "not_found", "errors"}.
+    """
+    valid = {member_id for member_id in map(_member_id, ids) if member_id is not None}
+    with transaction.atomic():
+        scoped = ProjectParticipants.objects.filter(user=owner, id__in=valid)
+        deleted = set(scoped.select_for_update().values_list('id', flat=True))
+        if deleted:
+            # post_delete invalidates the owner's dashboard (userAuthe.signals)
+            scoped.delete()
+
+    missing = _missing(valid - deleted, "You do not have permission to delete this member.")
+    return [
+        {'id': value, 'status': 'invalid', 'errors': {'id': ["A positive integer id is required."]}} if _member_id(value) is None
+        else {'id': value, 'status': 'deleted'} if value in deleted
+        else missing[value]
+        for value in ids
+    ]
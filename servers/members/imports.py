@@ -0,0 +1,170 @@
+import csv
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from importlib.util import find_spec
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .bulk import insert_participants, validate_participants
+from .models import ParticipantImport
+
+
+# openpyxl is an optional dependency: without it XLSX uploads are refused
+XLSX_SUPPORTED = find_spec('openpyxl') is not None
+
+logger = logging.getLogger(__name__)
+
+MAX_REPORTED_ERRORS = 1000
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def detect_format(filename):
+    extension = os.path.splitext(filename or '')[1].lower()
+    return {'.csv': 'csv', '.xlsx': 'xlsx'}.get(extension)
+
+
+def _header(name):
+    return str(name or '').strip().lower().replace(' ', '_')
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # spreadsheets store admission numbers as floats
+    return str(value).strip()
+
+
+def read_rows(fileobj, file_format):
+    """
+    Stream the data rows of a CSV or XLSX file (header on the first line) as
+    (row number, dict) pairs, keyed by the lower-cased header. Empty cells are
+    left out, so a blank row is an empty dict.
+    """
+    if file_format == 'xlsx':
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [_header(name) for name in next(rows, ())]
+            for number, values in enumerate(rows, 2):
+                yield number, {key: _cell(value) for key, value in zip(header, values) if key and _cell(value)}
+        finally:
+            workbook.close()
+        return
+
+    reader = csv.reader(io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline=''))
+    header = [_header(name) for name in next(reader, [])]
+    for number, values in enumerate(reader, 2):
+        yield number, {key: value.strip() for key, value in zip(header, values) if key and value.strip()}
+
+
+def _import_chunk(job, chunk, seen_usernames):
+    rows = [(number, data) for number, data in chunk if data]
+    results, pending = validate_participants([data for _, data in rows], seen_usernames)
+    errors = [{'row': rows[result['index']][0], 'errors': result['errors']} for result in results if result]
+
+    # Rows and progress in one transaction: a resumed import starts right after this chunk
+    with transaction.atomic():
+        insert_participants(pending, job.user)
+        job.processed_rows += len(chunk)
+        job.created_rows += len(pending)
+        job.error_rows += len(errors)
+        job.errors = (job.errors + errors)[:MAX_REPORTED_ERRORS]
+        job.save(update_fields=['processed_rows', 'created_rows', 'error_rows', 'errors', 'updated_at'])
+
+
+def claim_import(import_id, stale_after=None):
+    """
+    Mark an import as running for this worker. Pending and failed imports can
+    be claimed, and so can running ones without progress for `stale_after`
+    (default PARTICIPANT_IMPORT_STALE_AFTER) whose worker stopped. One
+    conditional UPDATE, so two workers never run the same import.
+    """
+    stale_after = settings.PARTICIPANT_IMPORT_STALE_AFTER if stale_after is None else stale_after
+    now = timezone.now()
+    return bool(ParticipantImport.objects.filter(
+        Q(status__in=['pending', 'failed']) | Q(status='running', updated_at__lt=now - timedelta(seconds=stale_after)),
+        pk=import_id,
+    ).update(status='running', message='', updated_at=now))
+
+
+def run_import(import_id, batch_size=None, stale_after=None):
+    """
+    Claim and run a ParticipantImport in batches of `batch_size` rows
+    (default PARTICIPANT_IMPORT_BATCH_SIZE), continuing after the rows it
+    already processed. Invalid rows are skipped and reported; the rest are
+    inserted. An import another worker is running is left alone.
+    """
+    batch_size = batch_size or settings.PARTICIPANT_IMPORT_BATCH_SIZE
+    if not claim_import(import_id, stale_after):
+        return ParticipantImport.objects.get(pk=import_id)
+
+    job = ParticipantImport.objects.select_related('user').get(pk=import_id)
+    if job.started_at is None:
+        job.started_at = timezone.now()
+        job.save(update_fields=['started_at', 'updated_at'])
+    try:
+        with job.file.open('rb') as fileobj:
+            rows = islice(read_rows(fileobj, job.file_format), job.processed_rows, None)
+            seen_usernames = set()
+            while chunk := list(islice(rows, batch_size)):
+                _import_chunk(job, chunk, seen_usernames)
+    except Exception as exc:
+        logger.exception("Participant import %s failed", job.pk)
+        job.refresh_from_db(fields=['processed_rows', 'created_rows', 'error_rows', 'errors'])
+        job.status = 'failed'
+        job.message = str(exc)
+    else:
+        job.status = 'completed'
+        job.file.delete(save=False)  # class lists hold personal data; keep only the report
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'message', 'file', 'finished_at', 'updated_at'])
+    return job
+
+
+def pending_imports(stale_after=None):
+    """Ids of imports waiting for a worker: pending, or running without progress for `stale_after`."""
+    stale_after = settings.PARTICIPANT_IMPORT_STALE_AFTER if stale_after is None else stale_after
+    stale = timezone.now() - timedelta(seconds=stale_after)
+    return list(ParticipantImport.objects.filter(
+        Q(status='pending') | Q(status='running', updated_at__lt=stale)
+    ).order_by('pk').values_list('pk', flat=True))
+
+
+def _run_in_background(import_id):
+    try:
+        run_import(import_id)
+    except Exception:
+        logger.exception("Participant import %s could not be run", import_id)
+    finally:
+        connections.close_all()  # this worker thread's connections
+
+
+def start_import(job):
+    """
+    Hand `job` to the in-process import threads once the transaction creating
+    it commits, if PARTICIPANT_IMPORT_WORKERS enables them. Otherwise, and for
+    anything lost when a server process stops, the job stays in the table
+    until `manage.py run_participant_imports --watch` picks it up.
+    """
+    global _executor
+    if not settings.PARTICIPANT_IMPORT_WORKERS:
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PARTICIPANT_IMPORT_WORKERS, thread_name_prefix='participant-import'
+            )
+    transaction.on_commit(lambda: _executor.submit(_run_in_background, job.pk))
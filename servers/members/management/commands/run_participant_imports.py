@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from members.imports import pending_imports, run_import
+
+
+class Command(BaseCommand):
+    help = (
+        "Run participant imports in this process: the given ids, or every import still pending "
+        "or left running by a worker that stopped. Imports resume after the rows already processed. "
+        "With --watch, keep running as the import worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help="Imports to run, including failed ones.")
+        parser.add_argument(
+            '--stale-minutes', type=int, default=None,
+            help="Treat running imports without progress for this long as interrupted "
+                 "(default: PARTICIPANT_IMPORT_STALE_AFTER).",
+        )
+        parser.add_argument('--watch', action='store_true', help="Keep polling for new imports.")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds between polls with --watch.")
+
+    def handle(self, *args, **options):
+        stale_after = None if options['stale_minutes'] is None else options['stale_minutes'] * 60
+        if options['ids']:
+            self.run(options['ids'], stale_after)
+            return
+
+        while True:
+            self.run(pending_imports(stale_after), stale_after)
+            if not options['watch']:
+                return
+            close_old_connections()
+            time.sleep(options['interval'])
+
+    def run(self, import_ids, stale_after):
+        for import_id in import_ids:
+            job = run_import(import_id, stale_after=stale_after)
+            if job.status == 'running':
+                continue  # another worker has it
+            style = self.style.SUCCESS if job.status == 'completed' else self.style.ERROR
+            self.stdout.write(style(
+                f"Import {job.pk} ({job.file_name}): {job.status}, {job.created_rows} created, "
+                f"{job.error_rows} rejected of {job.processed_rows} rows."
+            ))
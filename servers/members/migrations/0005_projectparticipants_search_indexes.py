@@ -0,0 +1,94 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:15
+#
+# Search indexes for members.search: lower(<field>) B-tree indexes for prefix
+# matches, plus substring (trigram) indexes over the same four fields.
+# SQLite: an external-content FTS5 table with the trigram tokenizer, kept in
+# sync by triggers. Django rebuilds SQLite tables for some schema changes,
+# which drops triggers, so a migration that alters members_projectparticipants
+# must call install_search_index again.
+# PostgreSQL: a pg_trgm GIN index over the fields joined by spaces.
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+FIELDS = "admision_no, first_name, last_name, mail"
+
+SQLITE_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS members_projectparticipants_fts USING fts5("
+    f"{FIELDS}, content='members_projectparticipants', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS members_projectparticipants_fts_ai AFTER INSERT ON members_projectparticipants BEGIN "
+    f"INSERT INTO members_projectparticipants_fts(rowid, {FIELDS}) "
+    "VALUES (new.id, new.admision_no, new.first_name, new.last_name, new.mail); END",
+    "CREATE TRIGGER IF NOT EXISTS members_projectparticipants_fts_ad AFTER DELETE ON members_projectparticipants BEGIN "
+    f"INSERT INTO members_projectparticipants_fts(members_projectparticipants_fts, rowid, {FIELDS}) "
+    "VALUES ('delete', old.id, old.admision_no, old.first_name, old.last_name, old.mail); END",
+    f"CREATE TRIGGER IF NOT EXISTS members_projectparticipants_fts_au AFTER UPDATE OF {FIELDS} "
+    "ON members_projectparticipants BEGIN "
+    f"INSERT INTO members_projectparticipants_fts(members_projectparticipants_fts, rowid, {FIELDS}) "
+    "VALUES ('delete', old.id, old.admision_no, old.first_name, old.last_name, old.mail); "
+    f"INSERT INTO members_projectparticipants_fts(rowid, {FIELDS}) "
+    "VALUES (new.id, new.admision_no, new.first_name, new.last_name, new.mail); END",
+    "INSERT INTO members_projectparticipants_fts(members_projectparticipants_fts) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS members_projectparticipants_fts_ai",
+    "DROP TRIGGER IF EXISTS members_projectparticipants_fts_ad",
+    "DROP TRIGGER IF EXISTS members_projectparticipants_fts_au",
+    "DROP TABLE IF EXISTS members_projectparticipants_fts",
+]
+
+# The expression must match members.search.POSTGRES_DOCUMENT
+POSTGRES_INSTALL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS members_projectparticipants_search_trgm ON members_projectparticipants "
+    "USING GIN ((coalesce(admision_no, '') || ' ' || first_name || ' ' || last_name || ' ' || coalesce(mail, '')) "
+    "gin_trgm_ops)",
+]
+
+POSTGRES_UNINSTALL = [
+    "DROP INDEX IF EXISTS members_projectparticipants_search_trgm",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def install_search_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_INSTALL, 'postgresql': POSTGRES_INSTALL})
+
+
+def uninstall_search_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRES_UNINSTALL})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0004_participantimport'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='projectparticipants',
+            index=models.Index(django.db.models.functions.text.Lower('admision_no'), name='participant_admision_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectparticipants',
+            index=models.Index(django.db.models.functions.text.Lower('first_name'), name='participant_first_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectparticipants',
+            index=models.Index(django.db.models.functions.text.Lower('last_name'), name='participant_last_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectparticipants',
+            index=models.Index(django.db.models.functions.text.Lower('mail'), name='participant_mail_idx'),
+        ),
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
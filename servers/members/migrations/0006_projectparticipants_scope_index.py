@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0005_projectparticipants_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='projectparticipants',
+            index=models.Index(fields=['user', 'last_name', 'first_name', 'admision_no', 'mail'], name='participant_scope_idx'),
+        ),
+    ]
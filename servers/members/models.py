@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from userAuthe.models import User, StudentProject
 # Create your models here.
 
@@ -14,7 +15,51 @@ class ProjectParticipants(models.Model):
     admision_no = models.CharField(max_length=100)
     programme = models.CharField(max_length=100)
     mail = models.CharField(max_length=100, blank=True, null=True)
-    
+
+    class Meta:
+        # Prefix search (members.search); substring search uses the trigram
+        # indexes installed by migration 0005. participant_scope_idx covers the
+        # row-by-row search of a student's or supervisor's participants.
+        indexes = [
+            models.Index(fields=['user', 'last_name', 'first_name', 'admision_no', 'mail'], name='participant_scope_idx'),
+            models.Index(Lower('admision_no'), name='participant_admision_idx'),
+            models.Index(Lower('first_name'), name='participant_first_name_idx'),
+            models.Index(Lower('last_name'), name='participant_last_name_idx'),
+            models.Index(Lower('mail'), name='participant_mail_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.first_name} {self.last_name} ({self.project.name})"
+
+
+class ParticipantImport(models.Model):
+    # A CSV/XLSX upload of ProjectParticipants rows, imported in the background
+    # by members.imports. Progress is committed with each batch of rows, so an
+    # interrupted import resumes after `processed_rows`.
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('xlsx', 'XLSX'),
+    ]
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='participant_imports')
+    file = models.FileField(upload_to='participant_imports/')
+    file_name = models.CharField(max_length=255)
+    file_format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_rows = models.PositiveIntegerField(default=0)
+    error_rows = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)  # the first MAX_REPORTED_ERRORS rows rejected
+    message = models.TextField(blank=True, default='')  # why the import failed
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
-        return f"{self.first_name} {self.last_name} ({self.project.name})"
\ No newline at end of file
+        return f"{self.file_name} ({self.status})"
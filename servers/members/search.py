@@ -0,0 +1,182 @@
+from django.db import connection
+from rest_framework.exceptions import ValidationError
+
+from userAuthe.models import StudentLead
+from .models import ProjectParticipants
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+SEARCH_FIELDS = ('admision_no', 'first_name', 'last_name', 'mail')
+MIN_TRIGRAM_TERM = 3  # shorter terms can't use the trigram indexes, only the prefix ones
+# Scopes up to this many participants are matched row by row, which beats
+# going through the search indexes of the whole table
+SCAN_LIMIT = 1000
+# Larger scopes, up to BROAD_SCAN_LIMIT participants, are also matched row by
+# row when the substring index yields BROAD_SCAN_RATIO times as many candidates
+# as the scope holds, about what it costs to scan that scope instead
+BROAD_SCAN_LIMIT = 5000
+BROAD_SCAN_RATIO = 3
+
+# Must match the members_projectparticipants_search_trgm index (PostgreSQL)
+POSTGRES_DOCUMENT = (
+    "(coalesce(p.admision_no, '') || ' ' || p.first_name || ' ' || p.last_name || ' ' || coalesce(p.mail, ''))"
+)
+
+
+def _scan(terms, scope_sql, scope_params, limit, offset):
+    # The scope is read through participant_scope_idx alone
+    table = connection.ops.quote_name(ProjectParticipants._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT p.id, p.admision_no, p.first_name, p.last_name, p.mail FROM {table} p WHERE {scope_sql}",
+            scope_params,
+        )
+        rows = cursor.fetchall()
+
+    # Each field is lowered once, behind a separator, so that a prefix match is
+    # a substring match of separator + term and a term can't span two fields
+    needles = [term if len(term) >= MIN_TRIGRAM_TERM else '\0' + term for term in terms]
+    exact, prefix = '\0' + terms[0] + '\0', '\0' + terms[0]
+    hits = []
+    for participant_id, admision_no, first_name, last_name, mail in rows:
+        document = f"\0{admision_no or ''}\0{first_name}\0{last_name}\0{mail or ''}".lower()
+        if all(needle in document for needle in needles):
+            # Exact admission number first, then prefix matches of the first term, then the rest
+            rank = 0 if document.startswith(exact) else 1 if prefix in document else 2
+            hits.append((rank, last_name, first_name, participant_id))
+    hits.sort()
+    return len(hits), [hit[-1] for hit in hits[offset:offset + limit]]
+
+
+def _prefix_sql(term):
+    # Any search field starting with `term`, on the already selected rows
+    return (
+        "(" + " OR ".join(f"substr(lower(p.{field}), 1, %s) = %s" for field in SEARCH_FIELDS) + ")",
+        [len(term), term] * len(SEARCH_FIELDS),
+    )
+
+
+def _indexed_prefix_sql(term):
+    # Same, as ranges over the lower(<field>) indexes so rows are found through them
+    upper = term[:-1] + chr(ord(term[-1]) + 1)
+    return (
+        "(" + " OR ".join(f"(lower(p.{field}) >= %s AND lower(p.{field}) < %s)" for field in SEARCH_FIELDS) + ")",
+        [term, upper] * len(SEARCH_FIELDS),
+    )
+
+
+def _sqlite_match(terms):
+    # Quoted so user input is never parsed as FTS5 syntax; the trigram tokenizer matches substrings
+    return ' '.join('"%s"' % term.replace('"', '""') for term in terms)
+
+
+def _postgres_like(term):
+    return '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+def _match_sql(terms):
+    # FROM and WHERE clauses selecting the participants that match `terms`, whoever they belong to
+    long_terms = [term for term in terms if len(term) >= MIN_TRIGRAM_TERM]
+    short_terms = [term for term in terms if len(term) < MIN_TRIGRAM_TERM]
+    table = connection.ops.quote_name(ProjectParticipants._meta.db_table)
+
+    where, params = [], []
+    if not long_terms:
+        source = f"FROM {table} p"
+        sql, term_params = _indexed_prefix_sql(short_terms.pop(0))
+        where.append(sql)
+        params += term_params
+    elif connection.vendor == 'sqlite':
+        fts = connection.ops.quote_name(ProjectParticipants._meta.db_table + '_fts')
+        source = f"FROM {fts} JOIN {table} p ON p.id = {fts}.rowid"
+        where.append(f"{fts} MATCH %s")
+        params.append(_sqlite_match(long_terms))
+    else:
+        source = f"FROM {table} p"
+        for term in long_terms:
+            where.append(f"{POSTGRES_DOCUMENT} ILIKE %s")
+            params.append(_postgres_like(term))
+    for term in short_terms:
+        sql, term_params = _prefix_sql(term)
+        where.append(sql)
+        params += term_params
+    return source, " AND ".join(where), params
+
+
+def _count_matches(terms, limit):
+    # Participants matching `terms` anywhere in the table, counted up to `limit`
+    source, where, params = _match_sql(terms)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM (SELECT 1 {source} WHERE {where} LIMIT %s) s", [*params, limit])
+        return cursor.fetchone()[0]
+
+
+def _indexed_search(terms, scope_sql, scope_params, limit, offset):
+    source, where, params = _match_sql(terms)
+    where, params = f"{scope_sql} AND {where}", [*scope_params, *params]
+
+    first_prefix, first_prefix_params = _prefix_sql(terms[0])
+    rank = f"CASE WHEN lower(p.admision_no) = %s THEN 0 WHEN {first_prefix} THEN 1 ELSE 2 END"
+
+    with connection.cursor() as cursor:
+        # The total comes with the page, so the matches are only looked up once
+        cursor.execute(
+            f"SELECT p.id, COUNT(*) OVER () {source} WHERE {where} "
+            f"ORDER BY {rank}, p.last_name, p.first_name, p.id LIMIT %s OFFSET %s",
+            [*params, terms[0], *first_prefix_params, limit, offset],
+        )
+        rows = cursor.fetchall()
+        if rows or not offset:
+            return (rows[0][1] if rows else 0), [row[0] for row in rows]
+        cursor.execute(f"SELECT COUNT(*) {source} WHERE {where}", params)  # past the last page
+        return cursor.fetchone()[0], []
+
+
+def search_participants(query, user, student_lead_id=None, page=1, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Case-insensitive search over the admission number, names and email of the
+    project participants visible to `user`: every term must match one of the
+    fields, terms of three or more characters anywhere in it, shorter ones at
+    its start. Supervisors search their students' participants (optionally one
+    student lead's), students their own. Returns (total, participants) with
+    exact admission numbers first, then prefix matches, then by name.
+    """
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        raise ValidationError({'q': f'Search is not supported on {connection.vendor}.'})
+    terms = query.lower().split()
+    if not terms:
+        return 0, []
+
+    if user.role == 'supervisor':
+        student_leads = connection.ops.quote_name(StudentLead._meta.db_table)
+        scope_sql = f"p.user_id IN (SELECT user_id FROM {student_leads} WHERE supervisor_id = %s"
+        scope_params = [user.id]
+        if student_lead_id is not None:
+            scope_sql += " AND user_id = %s"
+            scope_params.append(student_lead_id)
+        scope_sql += ")"
+    else:
+        scope_sql, scope_params = "p.user_id = %s", [user.id]
+
+    table = connection.ops.quote_name(ProjectParticipants._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM {table} p WHERE {scope_sql} LIMIT %s) s",
+            [*scope_params, BROAD_SCAN_LIMIT + 1],
+        )
+        scope_size = cursor.fetchone()[0]
+    # The prefix indexes stay cheap however many rows they yield, the substring
+    # index doesn't
+    long_terms = [term for term in terms if len(term) >= MIN_TRIGRAM_TERM]
+    broad_limit = BROAD_SCAN_RATIO * scope_size
+    if scope_size <= SCAN_LIMIT or (
+        long_terms and scope_size <= BROAD_SCAN_LIMIT and _count_matches(long_terms, broad_limit) >= broad_limit
+    ):
+        search = _scan
+    else:
+        search = _indexed_search
+    total, ids = search(terms, scope_sql, scope_params, page_size, (page - 1) * page_size)
+
+    participants = ProjectParticipants.objects.select_related('user').in_bulk(ids)
+    return total, [participants[participant_id] for participant_id in ids if participant_id in participants]
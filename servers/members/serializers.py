@@ -6,11 +6,12 @@
 
 from rest_framework import serializers
 from userAuthe.models import User, Supervisor, StudentLead, StudentProject, ProjectMembers
-from .models import ProjectParticipants
+from .models import ParticipantImport, ProjectParticipants
+from userAuthe.fieldsets import DynamicFieldsMixin
 from userAuthe.serializers import UserSerializer
 
 # Project Participants
-class ProjectParticipantsSerializer(serializers.ModelSerializer):
+class ProjectParticipantsSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     # project = ProjectSerializer(read_only=True)
 
@@ -46,4 +47,22 @@ class ProjectParticipantsSerializer(serializers.ModelSerializer):
         
         # Save the updated instance
         instance.save()
-        return instance
\ No newline at end of file
+        return instance
+
+class ParticipantUserSerializer(UserSerializer):
+    # Username uniqueness is checked for a whole batch at once (see members.bulk).
+    # Participant accounts are always students, whatever role the caller sends.
+    class Meta(UserSerializer.Meta):
+        extra_kwargs = {
+            'username': {'validators': User._meta.get_field('username').validators},
+            'role': {'read_only': True},
+        }
+
+
+class ParticipantImportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ParticipantImport
+        fields = [
+            'id', 'file_name', 'file_format', 'status', 'processed_rows', 'created_rows', 'error_rows',
+            'errors', 'message', 'created_at', 'started_at', 'finished_at',
+        ]
@@ -1,3 +1,327 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from userAuthe.compiled import compiled_serializer
+from userAuthe.factories import make_student_lead, make_supervisor
+from userAuthe.models import User
+from .imports import read_rows, run_import
+from .models import ParticipantImport, ProjectParticipants
+from .serializers import ProjectParticipantsSerializer
+
+
+class CompiledProjectParticipantsSerializerTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user(username='student', email='s@example.com')
+        ProjectParticipants.objects.create(
+            user=user, first_name='Ada', last_name='Lovelace', admision_no='A1', programme='BSc', mail='ada@example.com'
+        )
+        ProjectParticipants.objects.create(user=user, first_name='Alan', last_name='Turing', admision_no='A2', programme='BSc')
+
+    def assertParity(self, path=''):
+        request = Request(APIRequestFactory().get('/' + path))
+        queryset = ProjectParticipants.objects.order_by('id')
+        expected = ProjectParticipantsSerializer(queryset, many=True, context={'request': request}).data
+        compiled = compiled_serializer(ProjectParticipantsSerializer, request).serialize(queryset, request)
+        self.assertEqual(JSONRenderer().render(compiled), JSONRenderer().render(expected))
+
+    def test_parity(self):
+        self.assertParity()
+
+    def test_parity_with_fieldsets(self):
+        self.assertParity('?fields=id,first_name,mail')
+        self.assertParity('?fields=id,user')
+        self.assertParity('?fields=last_name,user.role')
+
+
+class AddProjectMembersTests(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def participants(self, count, start=0):
+        return [
+            {'first_name': 'First', 'last_name': f'Last {index}', 'admision_no': f'ADM{index}', 'programme': 'BSc',
+             'mail': f'{index}@example.com', 'username': f'participant{index}'}
+            for index in range(start, start + count)
+        ]
+
+    def post(self, participants):
+        return self.client.post('/members/create/', {'participants': participants}, format='json')
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        with self.assertNumQueries(5):
+            response = self.post(self.participants(5))
+        self.assertEqual(response.status_code, 201)
+
+        # Only the INSERTs grow, split by the database's limit on query parameters (SQLite: 999)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(self.participants(500, start=5))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(sum(1 for query in queries if not query['sql'].startswith('INSERT')), 3)
+        self.assertLess(len(queries), 20)
+        self.assertEqual(ProjectParticipants.objects.filter(user=self.owner).count(), 505)
+        self.assertTrue(User.objects.filter(username='participant504').exists())
+
+    def test_invalid_row_rejects_the_whole_batch(self):
+        participants = self.participants(3)
+        del participants[2]['programme']
+
+        response = self.post(participants)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            {error['index']: sorted(error['errors']) for error in response.json()['errors']}, {2: ['programme']}
+        )
+        self.assertFalse(ProjectParticipants.objects.exists())
+        self.assertFalse(User.objects.filter(username__startswith='participant').exists())
+
+    def test_taken_usernames_and_repeated_admission_numbers_are_still_added(self):
+        User.objects.create_user(username='participant0')
+        ProjectParticipants.objects.create(user=self.owner, first_name='A', last_name='B', admision_no='ADM1', programme='BSc')
+        participants = self.participants(3)
+        participants[2]['username'] = 'participant1'
+
+        response = self.post(participants)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ProjectParticipants.objects.filter(admision_no='ADM1').count(), 2)
+        self.assertEqual(ProjectParticipants.objects.count(), 4)
+        # The taken and the repeated username get no account; the first use in the input does
+        self.assertEqual(User.objects.filter(username__startswith='participant').count(), 2)
+
+    def test_participant_accounts_are_always_students(self):
+        participants = self.participants(2)
+        participants[0]['role'] = 'supervisor'
+
+        self.assertEqual(self.post(participants).status_code, 201)
+        self.assertEqual(
+            set(User.objects.filter(username__startswith='participant').values_list('role', flat=True)), {'student'}
+        )
+
+
+class ExportProjectMembersTests(TestCase):
+
+    def setUp(self):
+        profile = make_supervisor(first_name='Sam', last_name='Vimes')
+        supervisor = profile.user
+        student = make_student_lead(profile, first_name='Ada', last_name='Lovelace').user
+        other = User.objects.create_user(username='other')
+        ProjectParticipants.objects.create(user=student, first_name='Alan', last_name='Turing, Jr', admision_no='A1', programme='BSc')
+        ProjectParticipants.objects.create(user=other, first_name='Grace', last_name='Hopper', admision_no='A2', programme='BSc')
+        self.supervisor, self.student = supervisor, student
+
+    def export(self, user, query=''):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get('/members/export/' + query)
+
+    def test_csv_is_scoped_to_the_supervisors_students(self):
+        response = self.export(self.supervisor)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,student_lead_id,admission_no,first_name,last_name,programme,email')
+        self.assertEqual(lines[1:], [f'{ProjectParticipants.objects.get(admision_no="A1").id},{self.student.id},A1,Alan,"Turing, Jr",BSc,'])
+
+    def test_ndjson_for_admins_covers_everyone(self):
+        admin = User.objects.create_user(username='admin', is_staff=True)
+        response = self.export(admin, '?output=ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['admission_no'] for row in rows], ['A1', 'A2'])
+        self.assertIsNone(rows[0]['email'])
+
+    def test_students_and_unknown_formats_are_rejected(self):
+        self.assertEqual(self.export(self.student).status_code, 403)
+        self.assertEqual(self.export(self.supervisor, '?output=xml').status_code, 400)
+
+
+class SearchProjectMembersTests(TestCase):
+
+    def setUp(self):
+        profile = make_supervisor()
+        other_supervisor = make_supervisor(username='other')
+        self.supervisor = profile.user
+        self.first, self.second, self.outside = (
+            make_student_lead(supervisor, username=name).user
+            for supervisor, name in ((profile, 's1'), (profile, 's2'), (other_supervisor, 's3'))
+        )
+        for user, admision_no, first_name, last_name, mail in [
+            (self.first, 'ADA1', 'Ada', 'Lovelace', 'ada@uni.ac'),
+            (self.first, 'ADA', 'Zed', 'Adams', 'zed@uni.ac'),
+            (self.first, 'X3', 'Bob', 'Kadafi', None),
+            (self.second, 'Y1', 'Adaline', 'Byron', 'byron@uni.ac'),
+            (self.second, 'Y2', 'Grace', 'Hopper', 'grace@uni.ac'),
+            (self.outside, 'Z1', 'Ada', 'Outsider', 'ada@other.ac'),
+        ]:
+            ProjectParticipants.objects.create(
+                user=user, admision_no=admision_no, first_name=first_name, last_name=last_name, mail=mail,
+                programme='BSc'
+            )
+
+    def search(self, user, path):
+        # The same request answered by the row-by-row scan and through the indexes, which must agree
+        from . import search
+
+        client = APIClient()
+        client.force_authenticate(user)
+        responses = []
+        for name, limits in (('_scan', {'SCAN_LIMIT': 10 ** 6}), ('_indexed_search', {'SCAN_LIMIT': -1, 'BROAD_SCAN_LIMIT': -1})):
+            with mock.patch.multiple(search, **limits), mock.patch.object(search, name, wraps=getattr(search, name)) as used:
+                response = client.get('/members/search/' + path)
+            self.assertEqual(response.status_code, 200)
+            used.assert_called_once()
+            responses.append(response.json())
+        self.assertEqual(responses[0], responses[1])
+        return responses[0]['count'], [item['last_name'] for item in responses[0]['results']]
+
+    def test_exact_admission_numbers_then_prefixes_then_substrings(self):
+        self.assertEqual(self.search(self.supervisor, '?q=ada'), (4, ['Adams', 'Byron', 'Lovelace', 'Kadafi']))
+        self.assertEqual(self.search(self.supervisor, '?q=AD'), (3, ['Adams', 'Byron', 'Lovelace']))
+        self.assertEqual(self.search(self.supervisor, '?q=ada uni.ac'), (3, ['Adams', 'Byron', 'Lovelace']))
+        self.assertEqual(self.search(self.supervisor, '?q=hop g'), (1, ['Hopper']))
+        self.assertEqual(self.search(self.supervisor, '?q=zzz'), (0, []))
+
+    def test_pages(self):
+        self.assertEqual(self.search(self.supervisor, '?q=ada&page=2&page_size=3'), (4, ['Kadafi']))
+        self.assertEqual(self.search(self.supervisor, '?q=ada&page=3&page_size=3'), (4, []))
+
+    def test_supervisors_search_their_students_and_students_their_own(self):
+        self.assertEqual(self.search(self.first, '?q=ada'), (3, ['Adams', 'Lovelace', 'Kadafi']))
+        self.assertEqual(self.search(self.outside, '?q=ada'), (1, ['Outsider']))
+        # Narrowing only applies to supervisors, within their own students
+        self.assertEqual(self.search(self.first, f'?q=ada&student_lead={self.second.pk}')[0], 3)
+        self.assertEqual(self.search(self.supervisor, f'?q=ada&student_lead={self.second.pk}'), (1, ['Byron']))
+        self.assertEqual(self.search(self.supervisor, f'?q=ada&student_lead={self.outside.pk}'), (0, []))
+
+    def test_query_is_required(self):
+        client = APIClient()
+        client.force_authenticate(self.supervisor)
+        self.assertEqual(client.get('/members/search/?q=%20').status_code, 400)
+        self.assertEqual(client.get('/members/search/?q=ada&page=0').status_code, 400)
+
+
+class ParticipantImportTests(TestCase):
+
+    header = 'First Name,Last Name,Admision No,Programme,Mail,Username\r\n'
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.owner = User.objects.create_user(username='owner')
+
+    def create_import(self, lines):
+        content = (self.header + ''.join(line + '\r\n' for line in lines)).encode('utf-8-sig')
+        return ParticipantImport.objects.create(
+            user=self.owner, file=SimpleUploadedFile('class.csv', content), file_name='class.csv', file_format='csv'
+        )
+
+    def test_read_rows_decodes_and_maps_the_header(self):
+        content = (self.header + 'Ada, Lovelace ,A1,BSc,,ada\r\n\r\n"Turing, Alan",T,A2,BSc,a@x.org,\r\n').encode('utf-8-sig')
+        self.assertEqual(list(read_rows(io.BytesIO(content), 'csv')), [
+            (2, {'first_name': 'Ada', 'last_name': 'Lovelace', 'admision_no': 'A1', 'programme': 'BSc', 'username': 'ada'}),
+            (3, {}),
+            (4, {'first_name': 'Turing, Alan', 'last_name': 'T', 'admision_no': 'A2', 'programme': 'BSc', 'mail': 'a@x.org'}),
+        ])
+
+    def test_chunks_share_username_checks_and_report_bad_rows(self):
+        job = self.create_import([
+            'Ada,Lovelace,A1,BSc,,ada',
+            'Alan,Turing,A2,BSc,,alan',
+            'Grace,Hopper,A3,,,grace',  # no programme
+            'Ada,Byron,A4,BSc,,ada',    # username already used in the first chunk
+        ])
+
+        job = run_import(job.pk, batch_size=2)
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.processed_rows, job.created_rows, job.error_rows), (4, 3, 1))
+        self.assertEqual([error['row'] for error in job.errors], [4])
+        self.assertEqual(ProjectParticipants.objects.filter(user=self.owner).count(), 3)
+        self.assertEqual(sorted(User.objects.exclude(pk=self.owner.pk).values_list('username', flat=True)), ['ada', 'alan'])
+        self.assertFalse(job.file)
+
+    def test_a_failing_batch_marks_the_import_failed_and_keeps_earlier_progress(self):
+        job = self.create_import(['Ada,Lovelace,A1,BSc,,', 'Alan,Turing,A2,BSc,,'])
+        with mock.patch('members.imports.insert_participants', side_effect=[[], RuntimeError('database went away')]):
+            with self.assertLogs('members.imports', 'ERROR'):
+                job = run_import(job.pk, batch_size=1)
+
+        self.assertEqual((job.status, job.message), ('failed', 'database went away'))
+        self.assertEqual(job.processed_rows, 1)
+        self.assertIsNotNone(job.finished_at)
+
+        # Run again, it resumes with the second row
+        job = run_import(job.pk, batch_size=1)
+        self.assertEqual((job.status, job.processed_rows), ('completed', 2))
+        self.assertEqual(list(ProjectParticipants.objects.values_list('admision_no', flat=True)), ['A2'])
+
+    def test_an_import_running_elsewhere_is_not_run_twice(self):
+        job = self.create_import(['Ada,Lovelace,A1,BSc,,'])
+        ParticipantImport.objects.filter(pk=job.pk).update(status='running')
+
+        self.assertEqual(run_import(job.pk).status, 'running')
+        self.assertFalse(ProjectParticipants.objects.exists())
+        self.assertEqual(run_import(job.pk, stale_after=0).status, 'completed')
+
+
+class OwnedMemberDeleteTests(TestCase):
+
+    def setUp(self):
+        # Primary keys repeat between tests, so a dashboard cached by one would leak into the next
+        cache.clear()
+        self.owner = make_student_lead(username='owner').user
+        self.member = ProjectParticipants.objects.create(
+            user=self.owner, first_name='Ada', last_name='Lovelace', admision_no='A1', programme='BSc'
+        )
+        self.client = APIClient()
+
+    def test_delete_is_scoped_to_the_owner(self):
+        self.client.force_authenticate(User.objects.create_user(username='other'))
+        self.assertEqual(self.client.delete(f'/members/delete/{self.member.pk}/').status_code, 403)
+        self.assertEqual(self.client.delete('/members/delete/999999/').status_code, 404)
+        self.assertTrue(ProjectParticipants.objects.filter(pk=self.member.pk).exists())
+
+    def test_delete_refreshes_the_dashboard_through_signals(self):
+        from userAuthe.dashboard import get_dashboard
+
+        self.assertEqual(len(get_dashboard(self.owner.pk)['participants']), 1)
+        self.client.force_authenticate(self.owner)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(f'/members/delete/{self.member.pk}/').status_code, 204)
+        self.assertEqual(get_dashboard(self.owner.pk)['participants'], [])
+
+    def test_bulk_delete_is_scoped_and_refreshes_the_dashboard_through_signals(self):
+        from userAuthe.dashboard import get_dashboard
+
+        other = ProjectParticipants.objects.create(
+            user=User.objects.create_user(username='other'), first_name='Alan', last_name='Turing',
+            admision_no='A2', programme='BSc'
+        )
+        self.assertEqual(len(get_dashboard(self.owner.pk)['participants']), 1)
+        self.client.force_authenticate(self.owner)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/members/delete/bulk/', {'ids': [self.member.pk, other.pk]}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.json()['results']], ['deleted', 'forbidden'])
+        self.assertTrue(ProjectParticipants.objects.filter(pk=other.pk).exists())
+        self.assertEqual(get_dashboard(self.owner.pk)['participants'], [])
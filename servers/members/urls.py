@@ -6,6 +6,10 @@ from . import views
 
 urlpatterns = [
      path("create/", views.add_project_members, name="create_members"),
+     path("import/", views.import_project_members, name="import_members"),
+     path("import/<int:import_id>/", views.participant_import_status, name="participant_import_status"),
+     path("export/", views.export_project_members, name="export_members"),
+     path("search/", views.search_project_members, name="search_members"),
      path("view/<int:user_id>/", views.ProjectStudentDetailView.as_view(), name="view_members"),
 
 
@@ -13,4 +17,6 @@ urlpatterns = [
     path('view_one_member/<int:member_id>/', views.get_specific_member, name='get_specific_member'),
     path('delete/<int:member_id>/', views.delete_project_member, name='delete_project_member'),
     path('update/<int:member_id>/', views.update_project_member, name='update_project_member'),
+    path('delete/bulk/', views.delete_project_members_bulk, name='delete_project_members_bulk'),
+    path('update/bulk/', views.update_project_members_bulk, name='update_project_members_bulk'),
 ]
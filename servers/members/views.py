@@ -7,15 +7,27 @@ from django.core.exceptions import ObjectDoesNotExist
 from rest_framework.generics import RetrieveAPIView
 from userAuthe.models import StudentProject, StudentLead,ProjectMembers
 from userAuthe.serializers import ProjectSerializer, StudentLeadSerializer,UserSerializer,StudentMemberSerializer
-from rest_framework.decorators import api_view, permission_classes
+from userAuthe.compiled import compiled_serializer
+from userAuthe.dashboard import invalidate_dashboard
+from userAuthe.exports import cohort, export_response
+from userAuthe.fieldsets import prepare_queryset, section_fieldset
+from userAuthe.ownership import delete_owned, get_owned, update_owned
+from userAuthe.pagination import positive_int_param
+from django.db import transaction
+from django.urls import reverse
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework import status
 
 
 
 from rest_framework.permissions import IsAuthenticated
-from .models import ProjectParticipants
-from .serializers import ProjectParticipantsSerializer
+from .bulk import MAX_BATCH_SIZE, add_participants, delete_participants, update_participants
+from .imports import XLSX_SUPPORTED, detect_format, start_import
+from .models import ParticipantImport, ProjectParticipants
+from .search import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, search_participants
+from .serializers import ParticipantImportSerializer, ProjectParticipantsSerializer
 
 
 
@@ -23,41 +35,150 @@ from .serializers import ProjectParticipantsSerializer
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def add_project_members(request):
-    data = request.data  # Ensure this is a dictionary
-    participants_data = data.get('participants', [])  # Extract participants
+    """
+    Add {"participants": [...]} to the requesting student's project. The
+    batch is validated as a whole and inserted in one transaction, so either
+    every participant is added or none are and each failing row is reported.
+    """
+    participants_data = request.data.get('participants', []) if isinstance(request.data, dict) else None
 
     if not isinstance(participants_data, list):
         return Response({"error": "Expected a list of participants"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(participants_data) > MAX_BATCH_SIZE:
+        return Response({"error": f"At most {MAX_BATCH_SIZE} participants per batch"}, status=status.HTTP_400_BAD_REQUEST)
 
-    created_members = []
-    errors = []
+    created, results = add_participants(participants_data, request.user)
+    if created < len(participants_data):
+        errors = [result for result in results if result['status'] == 'invalid']
+        return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
 
-    for participant in participants_data:
-        # Validate and create user
-        user_serializer = UserSerializer(data=participant)
-        if user_serializer.is_valid():
-            user = user_serializer.save()
-            participant['user'] = user.id  # Assign the created user ID to the participant
+    return Response(
+        {"message": f"{created} project members added successfully", "results": results},
+        status=status.HTTP_201_CREATED
+    )
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([MultiPartParser])
+def import_project_members(request):
+    """
+    Queue a CSV/XLSX class list ("file") for a background import into the
+    requesting student's participants. Poll the returned import for progress.
+    """
+    upload = request.FILES.get('file')
+    file_format = detect_format(upload.name) if upload else None
+    if file_format is None:
+        return Response({"error": "Expected a CSV or XLSX file in \"file\""}, status=status.HTTP_400_BAD_REQUEST)
+    if file_format == 'xlsx' and not XLSX_SUPPORTED:
+        return Response({"error": "XLSX imports are not available on this server; upload a CSV"}, status=status.HTTP_400_BAD_REQUEST)
+
+    with transaction.atomic():
+        job = ParticipantImport.objects.create(
+            user=request.user, file=upload, file_name=upload.name[:255], file_format=file_format
+        )
+        start_import(job)
 
-        # Validate and create member
-        member_serializer = ProjectParticipantsSerializer(data=participant, context={'request': request})
-        if member_serializer.is_valid():
-            member = member_serializer.save()
-            created_members.append(member)
-        else:
-            errors.append(member_serializer.errors)
+    return Response(
+        ParticipantImportSerializer(job).data,
+        status=status.HTTP_202_ACCEPTED,
+        headers={'Location': reverse('participant_import_status', args=[job.pk])}
+    )
 
-    if errors:
-        return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def participant_import_status(request, import_id):
+    job = ParticipantImport.objects.filter(pk=import_id).first()
+    if job is None:
+        return Response({"error": "Import not found"}, status=status.HTTP_404_NOT_FOUND)
+    if job.user_id != request.user.id:
+        return Response({"error": "You do not have permission to view this import."}, status=status.HTTP_403_FORBIDDEN)
+    return Response(ParticipantImportSerializer(job).data, status=status.HTTP_200_OK)
+
+
+@api_view(['PUT', 'PATCH'])
+@permission_classes([IsAuthenticated])
+def update_project_members_bulk(request):
+    """
+    Batch variant of update_project_member: {"members": [{"id", <fields>...}, ...]},
+    applied in one transaction with a per-id outcome.
+    """
+    items = request.data.get('members') if isinstance(request.data, dict) else request.data
+    if not isinstance(items, list) or not items:
+        return Response({"error": "Expected a non-empty list of members"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > MAX_BATCH_SIZE:
+        return Response({"error": f"At most {MAX_BATCH_SIZE} members per batch"}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = update_participants(items, request.user)
+    updated = sum(1 for result in results if result['status'] == 'updated')
     return Response(
-        {"message": f"{len(created_members)} project members added successfully"},
-        status=status.HTTP_201_CREATED
+        {'updated': updated, 'failed': len(results) - updated, 'results': results},
+        status=status.HTTP_200_OK if updated else status.HTTP_400_BAD_REQUEST
     )
 
 
+@api_view(['POST', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def delete_project_members_bulk(request):
+    """Batch variant of delete_project_member: {"ids": [...]}, with a per-id outcome."""
+    ids = request.data.get('ids') if isinstance(request.data, dict) else request.data
+    if not isinstance(ids, list) or not ids:
+        return Response({"error": "Expected a non-empty list of ids"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(ids) > MAX_BATCH_SIZE:
+        return Response({"error": f"At most {MAX_BATCH_SIZE} ids per batch"}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = delete_participants(ids, request.user)
+    deleted = sum(1 for result in results if result['status'] == 'deleted')
+    return Response(
+        {'deleted': deleted, 'failed': len(results) - deleted, 'results': results},
+        status=status.HTTP_200_OK if deleted else status.HTTP_400_BAD_REQUEST
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_project_members(request):
+    """
+    Search participants by admission number, name or email: ?q=<terms>&page=&page_size=.
+    Supervisors search their students' participants and may narrow the search
+    to one student with ?student_lead=<id>; students search their own.
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'q': 'A search query is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    page = positive_int_param(request, 'page', 1)
+    page_size = min(positive_int_param(request, 'page_size', DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE)
+    student_lead_id = positive_int_param(request, 'student_lead', None)
+
+    total, participants = search_participants(query, request.user, student_lead_id, page, page_size)
+    return Response({
+        'count': total,
+        'page': page,
+        'page_size': page_size,
+        'results': ProjectParticipantsSerializer(participants, many=True).data,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_project_members(request):
+    """Stream the participants of the caller's cohort's projects (?output=csv|ndjson)."""
+    participants = cohort(ProjectParticipants.objects.order_by('id'), request.user, 'user__studentlead__supervisor_id')
+    if participants is None:
+        return Response({"error": "Only supervisors and admins can export cohort data."}, status=status.HTTP_403_FORBIDDEN)
+    return export_response(request, participants, [
+        ('id', 'id'),
+        ('student_lead_id', 'user_id'),
+        ('admission_no', 'admision_no'),
+        ('first_name', 'first_name'),
+        ('last_name', 'last_name'),
+        ('programme', 'programme'),
+        ('email', 'mail'),
+    ], 'members')
+
+
 #   VIEW MEMBERS      # 
 
 class ProjectStudentDetailView(RetrieveAPIView):
@@ -70,17 +191,18 @@ class ProjectStudentDetailView(RetrieveAPIView):
 
         try:
             # Get student lead by user_id
-            student_lead = StudentLead.objects.get(user_id=user_id)
+            student_lead = prepare_queryset(StudentLead.objects, StudentLeadSerializer, request).get(user_id=user_id)
             
             # Get project created by this student
             member = ProjectParticipants.objects.filter(user_id=user_id)
 
             # Serialize project data
-            member_data = ProjectParticipantsSerializer(member, many=True).data
+            members = section_fieldset(request, 'members')
+            member_data = compiled_serializer(ProjectParticipantsSerializer, request, members).serialize(member, request)
 
             # Combine student lead details with project list
             response_data = {
-                "student_lead": StudentLeadSerializer(student_lead).data,
+                "student_lead": StudentLeadSerializer(student_lead, context={'request': request}).data,
                 "members": member_data
             }
 
@@ -105,24 +227,25 @@ from .serializers import ProjectParticipantsSerializer
 @permission_classes([IsAuthenticated])
 def get_specific_member(request, member_id):
     try:
-        # Fetch the member by ID
-        member = ProjectParticipants.objects.get(id=member_id)
-        
-        # Check if the requesting user owns the member (if applicable)
-        if member.user != request.user:
-            return Response(
-                {"error": "You do not have permission to view this member."},
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
+        # Fetch the member by ID, only if the requesting user owns it
+        member = get_owned(
+            prepare_queryset(ProjectParticipants.objects, ProjectParticipantsSerializer, request),
+            request.user, "You do not have permission to view this member.", id=member_id
+        )
+
         # Serialize the member data
-        serializer = ProjectParticipantsSerializer(member)
+        serializer = ProjectParticipantsSerializer(member, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
     except ProjectParticipants.DoesNotExist:
         return Response(
             {"error": "Project member not found"},
             status=status.HTTP_404_NOT_FOUND
         )
+    except PermissionDenied as e:
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_403_FORBIDDEN
+        )
     except Exception as e:
         return Response(
             {"error": str(e)},
@@ -141,16 +264,12 @@ from .models import ProjectParticipants
 @permission_classes([IsAuthenticated])
 def delete_project_member(request, member_id):
     try:
-        # Fetch the member by ID
-        member = ProjectParticipants.objects.get(id=member_id)
-        
-        # Check if the requesting user owns the member (if applicable)
-        if member.user != request.user:
-            raise PermissionDenied("You do not have permission to delete this member.")
-        
-        # Delete the member
-        member.delete()
-        
+        # Scoped to the requesting user's members
+        delete_owned(
+            ProjectParticipants.objects, request.user,
+            "You do not have permission to delete this member.", id=member_id
+        )
+
         return Response(
             {"message": "Project member deleted successfully"},
             status=status.HTTP_204_NO_CONTENT
@@ -187,20 +306,20 @@ from .serializers import ProjectParticipantsSerializer
 @permission_classes([IsAuthenticated])
 def update_project_member(request, member_id):
     try:
-        # Fetch the member by ID
-        member = ProjectParticipants.objects.get(id=member_id)
-        
-        # Check if the requesting user owns the member (if applicable)
-        if member.user != request.user:
-            raise PermissionDenied("You do not have permission to update this member.")
-        
-        # Update the member
-        serializer = ProjectParticipantsSerializer(member, data=request.data, partial=True)
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        else:
+        serializer = ProjectParticipantsSerializer(data=request.data, partial=True)
+        if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # One UPDATE scoped to the requesting user's members
+        update_owned(
+            ProjectParticipants.objects, request.user, serializer.validated_data,
+            "You do not have permission to update this member.", id=member_id
+        )
+        # No post_save for the dashboard signal
+        transaction.on_commit(lambda: invalidate_dashboard(request.user.id))
+
+        member = ProjectParticipants.objects.select_related('user').get(id=member_id, user=request.user)
+        return Response(ProjectParticipantsSerializer(member).data, status=status.HTTP_200_OK)
     except ProjectParticipants.DoesNotExist:
         return Response(
             {"error": "Project member not found"},
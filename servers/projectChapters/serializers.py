@@ -1,8 +1,9 @@
 from rest_framework import serializers
 from .models import File
+from userAuthe.fieldsets import DynamicFieldsMixin
 from userAuthe.models import User
 
-class FileSerializer(serializers.ModelSerializer):
+class FileSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(read_only=True)  # Make user read-only
 
     class Meta:
@@ -1,3 +1,40 @@
 from django.test import TestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
 
-# Create your tests here.
+from userAuthe.compiled import compiled_serializer
+from userAuthe.models import User
+from .models import File
+from .serializers import FileSerializer
+
+
+class CompiledFileSerializerTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='student')
+        File.objects.create(user=self.user, chapter_name='Chapter 1', name='Intro', file='chapter_uploads_files/intro.pdf')
+        File.objects.create(user=self.user, chapter_name='Chapter 2', name='Empty', file='')
+
+    def assertParity(self, path='', with_request=True):
+        request = Request(APIRequestFactory().get('/' + path)) if with_request else None
+        queryset = File.objects.order_by('id')
+        expected = FileSerializer(queryset, many=True, context={'request': request}).data
+        compiled = compiled_serializer(FileSerializer, request).serialize(queryset, request)
+        self.assertEqual(JSONRenderer().render(compiled), JSONRenderer().render(expected))
+
+    def test_parity(self):
+        self.assertParity()
+        self.assertParity(with_request=False)
+
+    def test_parity_with_fieldsets(self):
+        self.assertParity('?fields=id,name,file')
+        self.assertParity('?fields=uploaded_at,user')
+
+    def test_files_list_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(f'/chapters/files_list/{self.user.id}/')
+        request = response.wsgi_request
+        expected = FileSerializer(File.objects.filter(user=self.user), many=True, context={'request': request}).data
+        self.assertEqual(response.content, JSONRenderer().render(expected))
@@ -5,8 +5,13 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from supabase import create_client
 import os
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
 from .models import File
 from .serializers import FileSerializer
+from userAuthe.compiled import compiled_serializer
+from userAuthe.fieldsets import prepare_queryset
+from userAuthe.ownership import delete_owned
 
 
 class FileListCreateView(generics.ListCreateAPIView):
@@ -89,7 +94,12 @@ class FileListView(generics.ListAPIView):
 
     def get_queryset(self):
         user_id = self.kwargs['user_id']  # Get user_id from the URL
-        return File.objects.filter(user_id=user_id)  # Filter files by user_id
+        return prepare_queryset(File.objects.filter(user_id=user_id), FileSerializer, self.request)  # Filter files by user_id
+
+    def list(self, request, *args, **kwargs):
+        # Same output as FileSerializer, rendered straight from .values() rows
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(compiled_serializer(FileSerializer, request).serialize(queryset, request))
 
 
 class FileDeleteView(generics.DestroyAPIView):
@@ -98,21 +108,24 @@ class FileDeleteView(generics.DestroyAPIView):
     permission_classes = [IsAuthenticated]  # Ensure only authenticated users can delete files
 
     def destroy(self, request, *args, **kwargs):
-        instance = self.get_object()
-        if instance.user != request.user:  # Ensure the user can only delete their own files
-            return Response(
-                {"error": "You do not have permission to delete this file."},
-                status=status.HTTP_403_FORBIDDEN,
+        # Scoped to the user's own files in the DELETE's lookup
+        try:
+            delete_owned(
+                self.get_queryset(), request.user, "You do not have permission to delete this file.",
+                **{self.lookup_field: self.kwargs[self.lookup_url_kwarg or self.lookup_field]}
             )
-        self.perform_destroy(instance)
+        except File.DoesNotExist:
+            raise Http404
+        except PermissionDenied as e:
+            return Response({"error": str(e)}, status=status.HTTP_403_FORBIDDEN)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class ChapterDetailView(APIView):
     def get(self, request, fileId, *args, **kwargs):
         try:
-            chapter = File.objects.get(id=fileId)  # Fetch the chapter by ID
-            serializer = FileSerializer(chapter)  # Serialize the data
+            chapter = prepare_queryset(File.objects, FileSerializer, request).get(id=fileId)  # Fetch the chapter by ID
+            serializer = FileSerializer(chapter, context={'request': request})  # Serialize the data
             return Response(serializer.data, status=status.HTTP_200_OK)
         except File.DoesNotExist:
             return Response(
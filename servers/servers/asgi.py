@@ -13,4 +13,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'servers.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up: the consumer pulls in models
+from chat.consumers import chat_socket  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # HTTP goes to Django; WebSockets are only used for the chat push channel
+    if scope['type'] == 'websocket':
+        await chat_socket(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
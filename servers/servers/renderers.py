@@ -0,0 +1,57 @@
+import msgpack
+import orjson
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+
+def default(obj):
+    # What orjson can't encode natively (it does datetime, date, time and UUID):
+    # DRF's JSONEncoder covers the rest the same way JSONRenderer would
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    return JSONEncoder().default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer on orjson. Output matches JSONRenderer's compact form, except
+    raw datetimes (not already formatted by a serializer field) keep their
+    microseconds.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        options = ORJSON_OPTIONS
+        if self.get_indent(accepted_media_type, renderer_context):
+            options |= orjson.OPT_INDENT_2  # the only indent orjson has
+        ret = orjson.dumps(data, default=default, option=options)
+
+        # Same as JSONRenderer: these are valid JSON but not valid JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+def msgpack_default(obj):
+    # msgpack has no datetime, UUID or Decimal; encode them as in the JSON output
+    return orjson.loads(orjson.dumps(obj, default=default, option=ORJSON_OPTIONS))
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=msgpack_default, use_bin_type=True)
@@ -65,10 +65,42 @@ AUTH_USER_MODEL = 'userAuthe.User'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
 
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'userAuthe.authentication.CachedJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': [
+        'servers.renderers.ORJSONRenderer',
+        'servers.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'servers.parsers.ORJSONParser',
+        'servers.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# Verified access tokens remembered by CachedJWTAuthentication (per process)
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_TOKEN_CACHE_TTL = 60
+
+# Refresh token blacklist (userAuthe.token_store). Other processes' blacklistings
+# are picked up at once with a shared cache backend, else within the sync interval.
+TOKEN_BLACKLIST_FILTER_CAPACITY = 100000
+TOKEN_BLACKLIST_SYNC_INTERVAL = 5
+TOKEN_BLACKLIST_REBUILD_INTERVAL = 3600
+# Blacklistings can commit out of id order (PostgreSQL), so each sync re-reads
+# the ids handed out during the last TOKEN_BLACKLIST_SYNC_OVERLAP seconds
+TOKEN_BLACKLIST_SYNC_OVERLAP = 60
+# Expired tokens are purged at most this often (seconds), a few chunks at a time
+TOKEN_PURGE_INTERVAL = 3600
+TOKEN_PURGE_MAX_CHUNKS = 10
+
+# Password hashing in bulk user provisioning: processes used by the provision_users
+# command (None: one per CPU), and threads shared by admin API requests in each server process
+PROVISIONING_WORKERS = None
+PROVISIONING_HASH_THREADS = 2
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=150),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=90),
@@ -99,6 +131,44 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Chat delta sync: upper bound for ?wait= on the "since" endpoint, how
+# often a waiting request re-checks the conversation, and how many requests
+# per process may wait at once (each holds a worker thread).
+CHAT_LONG_POLL_TIMEOUT = 25
+CHAT_LONG_POLL_INTERVAL = 1.0
+CHAT_LONG_POLL_MAX_WAITERS = 32
+
+# Real-time chat fan-out. InProcessBroker only reaches sockets served by the
+# same process; DatabaseBroker relays events between worker processes through
+# the chat_chatevent table.
+CHAT_BROKER = 'chat.broker.InProcessBroker'
+CHAT_BROKER_POLL_INTERVAL = 0.5
+CHAT_EVENT_RETENTION = 300
+
+# Messages older than this are moved into compressed monthly archives by
+# `manage.py archive_chat_messages`.
+CHAT_ARCHIVE_AFTER_DAYS = 365
+
+# Upper bound on how long a process serves its supervisor directory snapshot
+# (userAuthe.directory). Changes are picked up immediately when CACHES is a
+# shared backend; with the default per-process cache, after at most this long.
+SUPERVISOR_DIRECTORY_TTL = 60
+
+# Lifetime of a cached student dashboard (userAuthe.dashboard). Like the
+# directory, changes show up at once with a shared cache backend.
+STUDENT_DASHBOARD_TTL = 300
+
+# CSV/XLSX participant imports (members.imports) are queued in the database
+# and run by `manage.py run_participant_imports --watch`. A server process can
+# also run them on this many threads of its own (0: leave them to the worker),
+# but jobs it still holds are only recovered by the worker once stale.
+PARTICIPANT_IMPORT_WORKERS = 0
+PARTICIPANT_IMPORT_BATCH_SIZE = 500
+# Seconds without progress after which a running import counts as interrupted
+PARTICIPANT_IMPORT_STALE_AFTER = 600
+
+# Rows fetched per query, and written per block, by the streaming exports (userAuthe.exports)
+EXPORT_CHUNK_SIZE = 2000
 
 
 MIDDLEWARE = [
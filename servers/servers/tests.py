@@ -0,0 +1,93 @@
+import io
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+import msgpack
+from django.test import SimpleTestCase, TestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from userAuthe.factories import make_student_lead, make_supervisor
+from .parsers import MessagePackParser, ORJSONParser
+from .renderers import MessagePackRenderer, ORJSONRenderer
+
+
+PAYLOAD = {
+    'at': datetime(2024, 1, 2, 3, 4, 5, 600, tzinfo=dt_timezone.utc),
+    'id': uuid.UUID(int=1),
+    'amount': Decimal('1.50'),
+    'label': gettext_lazy('Student'),
+    'nested': [{'line': 'a b'}, None, True],
+}
+
+
+class ORJSONTests(SimpleTestCase):
+
+    def test_output_matches_json_renderer(self):
+        self.assertEqual(ORJSONRenderer().render(PAYLOAD), JSONRenderer().render(PAYLOAD))
+        self.assertIn(b'"at":"2024-01-02T03:04:05.000600Z"', ORJSONRenderer().render(PAYLOAD))
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_round_trip(self):
+        body = ORJSONRenderer().render(PAYLOAD)
+        self.assertEqual(ORJSONParser().parse(io.BytesIO(body)), {
+            'at': '2024-01-02T03:04:05.000600Z',
+            'id': '00000000-0000-0000-0000-000000000001',
+            'amount': 1.5,
+            'label': 'Student',
+            'nested': [{'line': 'a b'}, None, True],
+        })
+
+    def test_invalid_json_is_a_parse_error(self):
+        for body in (b'{"a": ', b'{"a": NaN}'):
+            with self.assertRaises(ParseError):
+                ORJSONParser().parse(io.BytesIO(body))
+
+
+class MessagePackTests(SimpleTestCase):
+
+    def test_values_are_encoded_as_in_the_json_output(self):
+        body = MessagePackRenderer().render(PAYLOAD)
+        self.assertEqual(MessagePackParser().parse(io.BytesIO(body)), ORJSONParser().parse(
+            io.BytesIO(ORJSONRenderer().render(PAYLOAD))
+        ))
+        self.assertEqual(MessagePackRenderer().render(None), b'')
+
+    def test_invalid_body_is_a_parse_error(self):
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(io.BytesIO(b'\xc1'))
+
+
+class ContentNegotiationTests(TestCase):
+
+    def setUp(self):
+        supervisor = make_supervisor()
+        self.student_lead = make_student_lead(supervisor)
+        self.student = self.student_lead.user
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.path = f'/chat/chat_messages/{self.student_lead.pk}/{supervisor.pk}/'
+        self.message = {'student_lead': self.student_lead.pk, 'supervisor': supervisor.pk, 'content': 'hi'}
+
+    def test_accept_header_picks_the_format(self):
+        response = self.client.get(self.path, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), [])
+
+        for accept in ('application/json', '*/*', 'application/json, application/msgpack;q=0.5'):
+            response = self.client.get(self.path, HTTP_ACCEPT=accept)
+            self.assertEqual(response['Content-Type'], 'application/json')
+            self.assertEqual(response.content, b'[]')
+
+        self.assertEqual(self.client.get(self.path, HTTP_ACCEPT='application/xml').status_code, 406)
+
+    def test_msgpack_request_bodies_are_parsed(self):
+        response = self.client.post(
+            '/chat/chat_messages/bulk/', msgpack.packb({'messages': [self.message]}),
+            content_type='application/msgpack', HTTP_ACCEPT='application/msgpack',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(msgpack.unpackb(response.content)['created'], 1)
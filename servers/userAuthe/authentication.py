@@ -0,0 +1,136 @@
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache_versions import bump_version, get_version
+
+
+USER_VERSION_KEY = 'auth_user_version:%s'
+
+# Writes limited to these fields can't change who the user is or what they may do
+AUTH_NEUTRAL_FIELDS = {'last_login'}
+
+
+def user_version(user_id):
+    return get_version(USER_VERSION_KEY % user_id)
+
+
+def invalidate_user(user_id):
+    """Drop cached authentications of a user (deactivated, role changed, deleted)."""
+    bump_version(USER_VERSION_KEY % user_id)
+    token_cache.discard_user(user_id)
+
+
+def invalidate_users(user_ids):
+    for user_id in user_ids:
+        invalidate_user(user_id)
+
+
+class TokenCache:
+    """
+    Bounded LRU of authenticated tokens keyed by the SHA-256 of the raw token.
+    Entries expire after AUTH_TOKEN_CACHE_TTL seconds or when the token does,
+    whichever comes first.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._keys_by_user = defaultdict(set)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry['expires_at'] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, validated_token, user, version):
+        ttl = settings.AUTH_TOKEN_CACHE_TTL
+        exp = validated_token.get('exp')
+        if exp is not None:
+            ttl = min(ttl, exp - time.time())
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = {
+                'expires_at': time.monotonic() + ttl,
+                'token': validated_token,
+                'user': user,
+                'version': version,
+            }
+            self._keys_by_user[user.pk].add(key)
+            while len(self._entries) > settings.AUTH_TOKEN_CACHE_SIZE:
+                self._remove(next(iter(self._entries)))
+
+    def discard_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._keys_by_user.get(entry['user'].pk)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[entry['user'].pk]
+
+
+token_cache = TokenCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that remembers tokens it has already verified.
+
+    A repeat token skips signature verification. On read-only requests (GET,
+    HEAD, OPTIONS) it also skips the user query and gets a private copy of
+    the user loaded when the token was first seen. Writes always reload the
+    user. Entries are dropped when the user is saved, updated in bulk through
+    User.objects (see UserQuerySet) or deleted (see userAuthe.signals); with
+    a per-process cache backend other processes notice after at most
+    AUTH_TOKEN_CACHE_TTL. Raw SQL against the user table bypasses all of this.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        key = hashlib.sha256(raw_token).hexdigest()
+        entry = token_cache.get(key)
+        if entry is not None and entry['version'] == user_version(entry['user'].pk):
+            if request.method in SAFE_METHODS:
+                return copy.copy(entry['user']), entry['token']
+            return self.get_user(entry['token']), entry['token']
+
+        validated_token = self.get_validated_token(raw_token)
+        # Read the version before the user so a concurrent change can't be cached as current
+        version = user_version(validated_token.get(api_settings.USER_ID_CLAIM))
+        user = self.get_user(validated_token)
+        token_cache.set(key, validated_token, copy.copy(user), version)
+        return user, validated_token
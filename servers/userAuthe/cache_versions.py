@@ -0,0 +1,21 @@
+import time
+
+from django.core.cache import cache
+
+
+def get_version(key):
+    """
+    The version stored under `key` in the shared cache, set on first use.
+    Whatever is cached under or checked against a version is stale once the
+    version is bumped.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    # A fresh timestamp rather than incr(): still unique if the key was evicted
+    cache.set(key, time.time_ns(), None)
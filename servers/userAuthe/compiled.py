@@ -0,0 +1,113 @@
+import threading
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from .fieldsets import Fieldset
+
+
+# Fields whose to_representation() returns a database value unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.ReadOnlyField,
+    serializers.PrimaryKeyRelatedField,
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.EmailField,
+    serializers.ChoiceField,
+)
+
+# Fieldsets come from the query string, so only this many variants are kept
+MAX_COMPILED = 256
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+def _file_url(storage, use_url):
+    # FileField.to_representation() for a stored name instead of a FieldFile
+    def file_url(name, request):
+        if not name:
+            return None
+        if not use_url:
+            return name
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+    return file_url
+
+
+def _compile_fields(serializer, model, prefix, namespace, lookups):
+    items = []
+    for field in serializer._readable_fields:
+        if field.source == '*' or len(field.source_attrs) != 1:
+            raise ImproperlyConfigured(f"Can't compile {type(serializer).__name__}.{field.field_name}")
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            raise ImproperlyConfigured(f"Can't compile {type(serializer).__name__}.{field.field_name}")
+
+        lookup = prefix + model_field.name
+        if lookup not in lookups:
+            lookups.append(lookup)
+        value = f"row[{lookup!r}]"
+
+        if isinstance(field, serializers.BaseSerializer):
+            if isinstance(field, serializers.ListSerializer) or not model_field.concrete or not model_field.is_relation:
+                raise ImproperlyConfigured(f"Can't compile {type(serializer).__name__}.{field.field_name}")
+            nested = _compile_fields(field, model_field.related_model, lookup + '__', namespace, lookups)
+            expression = f"(None if {value} is None else {nested})"
+        elif type(field) in PASSTHROUGH_FIELDS:
+            expression = value
+        else:
+            name = f"_f{len(namespace)}"
+            if isinstance(field, serializers.FileField):
+                namespace[name] = _file_url(model_field.storage, getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL))
+                expression = f"{name}({value}, request)"
+            else:
+                namespace[name] = field.to_representation
+                expression = f"(None if (value := {value}) is None else {name}(value))"
+        items.append(f"{field.field_name!r}: {expression}")
+    return "{" + ", ".join(items) + "}"
+
+
+class CompiledSerializer:
+    """
+    A read-only serializer compiled into one function over .values() rows.
+
+    Renders exactly what `serializer_class(instance).data` would, as plain
+    dicts, without DRF's per-field machinery. Only model fields, forward
+    relations and nested serializers of those are supported.
+    """
+
+    def __init__(self, serializer_class, fieldset=None):
+        serializer = serializer_class(fieldset=fieldset) if fieldset is not None else serializer_class()
+        model = serializer_class.Meta.model
+        namespace = {}
+        self.lookups = []
+        body = _compile_fields(serializer, model, '', namespace, self.lookups)
+        source = f"def render(row, request):\n    return {body}\n"
+        exec(compile(source, f"<compiled {serializer_class.__name__}>", 'exec'), namespace)
+        self.render = namespace['render']
+        self.serializer = serializer  # keeps the fields the function calls into alive
+
+    def serialize(self, queryset, request=None):
+        render = self.render
+        return [render(row, request) for row in queryset.values(*self.lookups)]
+
+
+def compiled_serializer(serializer_class, request=None, fieldset=None):
+    """The (cached) CompiledSerializer for `serializer_class` and the request's fieldset."""
+    if fieldset is None:
+        fieldset = Fieldset.from_request(request)
+    key = (serializer_class, None if fieldset is None else (
+        None if fieldset.fields is None else frozenset(fieldset.fields), frozenset(fieldset.expand)
+    ))
+    compiled = _compiled.get(key)
+    if compiled is None:
+        with _compiled_lock:
+            compiled = _compiled.get(key)
+            if compiled is None:
+                compiled = CompiledSerializer(serializer_class, fieldset)
+                if len(_compiled) < MAX_COMPILED:
+                    _compiled[key] = compiled
+    return compiled
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from chat.models import ConversationSummary
+from chat.serializers import ConversationSummarySerializer
+from members.models import ProjectParticipants
+from members.serializers import ProjectParticipantsSerializer
+from projectChapters.models import File
+from projectChapters.serializers import FileSerializer
+from .cache_versions import bump_version, get_version
+from .models import ProjectMembers, StudentLead, StudentProject
+from .serializers import ProjectSerializer, StudentLeadSerializer, StudentMemberSerializer
+
+
+VERSION_KEY = 'student_dashboard:version:%s'
+DASHBOARD_KEY = 'student_dashboard:%s:%s'
+
+
+class DashboardConversationSerializer(ConversationSummarySerializer):
+    # "unread" depends on who is asking, so it is added per request rather than cached
+    class Meta(ConversationSummarySerializer.Meta):
+        fields = [field for field in ConversationSummarySerializer.Meta.fields if field != 'unread']
+
+
+def invalidate_dashboard(user_id):
+    """Drop the cached dashboard of a student (see userAuthe.signals for the automatic cases)."""
+    bump_version(VERSION_KEY % user_id)
+
+
+def _build(user_id):
+    student_lead = StudentLead.objects.select_related('user', 'supervisor__user').filter(user_id=user_id).first()
+    if student_lead is None:
+        return None
+
+    projects = StudentProject.objects.filter(user_id=user_id).select_related('user')
+    members = ProjectMembers.objects.filter(user_id=user_id).select_related('user')
+    participants = ProjectParticipants.objects.filter(user_id=user_id).select_related('user').order_by('id')
+    files = File.objects.filter(user_id=user_id).order_by('chapter_name', 'uploaded_at', 'id')
+    conversations = ConversationSummary.objects.filter(student_lead_id=user_id).select_related(
+        'student_lead', 'last_message__user'
+    ).order_by('-last_activity_at')
+
+    return {
+        'student_lead': StudentLeadSerializer(student_lead).data,
+        'projects': ProjectSerializer(projects, many=True).data,
+        'members': StudentMemberSerializer(members, many=True).data,
+        'participants': ProjectParticipantsSerializer(participants, many=True).data,
+        'files': FileSerializer(files, many=True).data,
+        'conversations': DashboardConversationSerializer(conversations, many=True).data,
+    }
+
+
+def get_dashboard(user_id):
+    """
+    Everything the student dashboard shows for the student `user_id`: profile
+    with supervisor, project, member profile, participants, chapter files
+    (with site-relative URLs) and chat conversations, or None if there is no
+    such student. Built with a fixed six queries and cached per student until
+    one of the underlying rows changes, or for STUDENT_DASHBOARD_TTL seconds.
+    """
+    key = DASHBOARD_KEY % (user_id, get_version(VERSION_KEY % user_id))
+    dashboard = cache.get(key)
+    if dashboard is None:
+        dashboard = _build(user_id)
+        if dashboard is not None:
+            cache.set(key, dashboard, settings.STUDENT_DASHBOARD_TTL)
+    return dashboard
@@ -0,0 +1,62 @@
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+from . import cache_versions
+from .models import Supervisor
+
+
+VERSION_KEY = 'supervisor_directory:version'
+SNAPSHOT_KEY = 'supervisor_directory:snapshot:%s'
+
+# (version, built_at, body, etag) of the snapshot this process last served
+_snapshot = (None, 0, b'', '')
+_rebuild_lock = threading.Lock()
+
+
+def bump_version():
+    """Invalidate the directory everywhere the cache is shared."""
+    cache_versions.bump_version(VERSION_KEY)
+
+
+def _render():
+    supervisors = Supervisor.objects.filter().values("user_id", "first_name", "last_name", "department")
+    body = json.dumps(list(supervisors), cls=DjangoJSONEncoder).encode()
+    return body, '"%s"' % hashlib.sha1(body).hexdigest()
+
+
+def get_directory():
+    """
+    Pre-rendered JSON body and ETag of the supervisor directory.
+
+    Served from this process' memory while the cached version is unchanged.
+    The version is bumped whenever a Supervisor is saved or deleted. With a
+    per-process cache backend other processes can't see the bump, so a
+    snapshot is also rebuilt once it is SUPERVISOR_DIRECTORY_TTL seconds old.
+    """
+    global _snapshot
+
+    version = cache_versions.get_version(VERSION_KEY)
+    ttl = settings.SUPERVISOR_DIRECTORY_TTL
+    snapshot_version, built_at, body, etag = _snapshot
+    if snapshot_version == version and time.monotonic() - built_at < ttl:
+        return body, etag
+
+    # One rebuild per process at a time; the other threads reuse its result
+    with _rebuild_lock:
+        snapshot_version, built_at, body, etag = _snapshot
+        if snapshot_version == version and time.monotonic() - built_at < ttl:
+            return body, etag
+
+        cached = cache.get(SNAPSHOT_KEY % version)
+        if cached is None:
+            cached = _render()
+            cache.set(SNAPSHOT_KEY % version, cached, ttl)
+        body, etag = cached
+        _snapshot = (version, time.monotonic(), body, etag)
+        return body, etag
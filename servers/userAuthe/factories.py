@@ -0,0 +1,14 @@
+"""Test fixtures shared by the apps' tests: supervisors and student leads with their accounts."""
+from .models import StudentLead, Supervisor, User
+
+
+def make_supervisor(username='supervisor', **profile):
+    """A supervisor account and its Supervisor profile; `profile` sets the profile's fields."""
+    user = User.objects.create_user(username=username, role='supervisor')
+    return Supervisor.objects.create(user=user, **profile)
+
+
+def make_student_lead(supervisor=None, username='student', email='', **profile):
+    """A student account and its StudentLead profile under `supervisor`."""
+    user = User.objects.create_user(username=username, email=email)
+    return StudentLead.objects.create(user=user, supervisor=supervisor, **profile)
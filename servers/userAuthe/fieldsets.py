@@ -0,0 +1,158 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _split(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class Fieldset:
+    """
+    A ?fields= / ?expand= selection for a serializer.
+
+    `fields` is None for all fields. Nested relations are rendered as their
+    primary key unless expanded; a dotted name ("supervisor.first_name")
+    selects inside a relation and implies expanding it.
+    """
+
+    def __init__(self, fields=None, expand=()):
+        self.fields = None if fields is None else set(fields)
+        self.expand = set(expand)
+
+    @classmethod
+    def from_request(cls, request):
+        # Reads only, so a ?fields= on a write can't drop fields the input needs
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        params = getattr(request, 'query_params', request.GET)
+        if 'fields' not in params and 'expand' not in params:
+            return None
+        fields = _split(params['fields']) if 'fields' in params else None
+        return cls(fields, _split(params.get('expand', '')))
+
+    def includes(self, name):
+        return self.fields is None or name in {field.split('.', 1)[0] for field in self.fields}
+
+    def expands(self, name):
+        prefix = name + '.'
+        return name in self.expand or any(item.startswith(prefix) for item in self.expand | (self.fields or set()))
+
+    def child(self, name):
+        prefix = name + '.'
+        fields = {field[len(prefix):] for field in self.fields or () if field.startswith(prefix)}
+        return Fieldset(fields or None, {field[len(prefix):] for field in self.expand if field.startswith(prefix)})
+
+
+class DynamicFieldsMixin:
+    """
+    Serializer mixin for sparse fieldsets. The selection comes from the
+    `fieldset` argument or, for the top-level serializer, from the request
+    in the context; without either the output is unchanged.
+    """
+
+    # Model fields each SerializerMethodField reads, so querysets can be prepared for it;
+    # a relation named by its field is joined, by its attname ("user_id") only the key is loaded
+    method_field_sources = {}
+
+    def __init__(self, *args, fieldset=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._fieldset = fieldset
+
+    def get_fieldset(self):
+        if self._fieldset is not None:
+            return self._fieldset
+        parent = self.parent.parent if isinstance(self.parent, serializers.ListSerializer) else self.parent
+        if parent is None:
+            return Fieldset.from_request(self.context.get('request'))
+        return None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return fields
+
+        for name in list(fields):
+            if not fieldset.includes(name):
+                del fields[name]
+                continue
+            field = fields[name]
+            nested = field.child if isinstance(field, serializers.ListSerializer) else field
+            if not isinstance(nested, serializers.BaseSerializer):
+                continue
+            if fieldset.expands(name):
+                if isinstance(nested, DynamicFieldsMixin):
+                    nested._fieldset = fieldset.child(name)
+            else:
+                fields[name] = serializers.PrimaryKeyRelatedField(
+                    read_only=True, many=nested is not field, source=field.source
+                )
+        return fields
+
+
+def _plan(serializer, model, prefix):
+    # (select_related paths, only() columns or None when they can't be known)
+    related, columns = [], []
+    for name, field in serializer.fields.items():
+        if isinstance(field, serializers.SerializerMethodField) and name in getattr(serializer, 'method_field_sources', {}):
+            for source in serializer.method_field_sources[name]:
+                model_field = model._meta.get_field(source)
+                if model_field.is_relation and source == model_field.name:  # "supervisor_id" loads just the key
+                    related.append(prefix + model_field.name)
+                if columns is not None:
+                    columns.append(prefix + model_field.name)
+            continue
+        if field.source == '*' or len(field.source_attrs) > 1:
+            columns = None
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            if hasattr(model, field.source):
+                columns = None  # a property: could read anything
+            continue
+
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        if isinstance(nested, serializers.BaseSerializer) and model_field.is_relation and model_field.concrete:
+            path = prefix + model_field.name
+            related.append(path)
+            nested_related, nested_columns = _plan(nested, model_field.related_model, path + '__')
+            related += nested_related
+            if columns is not None:
+                columns += [path] + (nested_columns or [])
+        elif model_field.concrete and columns is not None:
+            columns.append(prefix + model_field.name)
+    return related, columns
+
+
+def section_fieldset(request, name):
+    """
+    The request's selection for the `name` list of a response that combines
+    several serializers: "?fields=first_name,projects.title" selects the main
+    object's first_name and the titles in "projects". None without a selection.
+    """
+    fieldset = Fieldset.from_request(request)
+    return None if fieldset is None else fieldset.child(name)
+
+
+def prepare_queryset(queryset, serializer_class, request=None, fieldset=None, also_load=()):
+    """
+    Join in the relations `serializer_class` will render in full and, for a
+    sparse fieldset, load only the columns it reads plus `also_load` (those
+    the view itself uses). Reverse relations are left alone.
+    """
+    serializer = serializer_class(context={'request': request}, fieldset=fieldset)
+    related, columns = _plan(serializer, queryset.model, '')
+    if related:
+        queryset = queryset.select_related(*related)
+    if columns is not None and serializer.get_fieldset() is not None:
+        queryset = queryset.only(*columns, *also_load)
+    return queryset
+
+
+class FieldsetQuerysetMixin:
+    """Generic view mixin: get_queryset() prepared for the requested fieldset."""
+
+    def get_queryset(self):
+        return prepare_queryset(super().get_queryset(), self.get_serializer_class(), self.request)
@@ -0,0 +1,88 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from chat.models import ChatMessage
+from chat.views import get_chat_messages
+from servers.parsers import MessagePackParser, ORJSONParser
+from servers.renderers import MessagePackRenderer, ORJSONRenderer, msgpack
+from userAuthe.models import StudentLead, StudentProject, Supervisor, User
+from userAuthe.views import SupervisorStudentDetailView
+
+
+class Command(BaseCommand):
+    help = (
+        "Render and parse times of DRF's JSON, the orjson and (if installed) the MessagePack "
+        "renderers/parsers over get_chat_messages and studentleadsupervisor payloads. "
+        "Works on generated rows and rolls them back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=5000, help="Messages in the chat thread.")
+        parser.add_argument('--students', type=int, default=200, help="Students of the supervisor (one page).")
+        parser.add_argument('--repeat', type=int, default=20, help="Best of this many runs.")
+
+    def handle(self, *args, **options):
+        formats = [('DRF json', JSONRenderer(), JSONParser()), ('orjson', ORJSONRenderer(), ORJSONParser())]
+        if msgpack is not None:
+            formats.append(('msgpack', MessagePackRenderer(), MessagePackParser()))
+        else:
+            self.stdout.write("msgpack is not installed; skipping application/msgpack.")
+
+        with transaction.atomic():
+            for endpoint, data in self.payloads(options['messages'], options['students']):
+                for name, renderer, parser in formats:
+                    render = self.best(options['repeat'], lambda: renderer.render(data))
+                    body = renderer.render(data)
+                    parse = self.best(options['repeat'], lambda: parser.parse(io.BytesIO(body)))
+                    self.stdout.write(
+                        f"{endpoint:22} {name:9} {len(body):>10,} bytes   "
+                        f"render {render * 1000:>8.2f} ms   parse {parse * 1000:>8.2f} ms"
+                    )
+            transaction.set_rollback(True)
+
+    def payloads(self, messages, students):
+        factory = APIRequestFactory()
+        supervisor_user = User.objects.create(username='benchmark-renderers-supervisor', role='supervisor')
+        supervisor = Supervisor.objects.create(user=supervisor_user, first_name='Ada', last_name='Lovelace',
+                                               department='Computing')
+        users = User.objects.bulk_create([
+            User(username=f'benchmark-renderers-{index}', role='student') for index in range(students)
+        ])
+        StudentLead.objects.bulk_create([
+            StudentLead(user=user, supervisor=supervisor, first_name='Student', last_name=f'Nº {index}',
+                        programme='BSc Computer Science')
+            for index, user in enumerate(users)
+        ])
+        StudentProject.objects.bulk_create([
+            StudentProject(user=user, title=f'Benchmark project {index}', description='Lorem ipsum dolor sit amet. ' * 8)
+            for index, user in enumerate(users)
+        ])
+        student_lead = StudentLead.objects.get(user=users[0])
+        ChatMessage.objects.bulk_create([
+            ChatMessage(user=supervisor_user if index % 2 else users[0], student_lead=student_lead,
+                        supervisor=supervisor, content=f'Message {index}: how is chapter two going? ✓')
+            for index in range(messages)
+        ])
+
+        request = factory.get('/')
+        force_authenticate(request, user=users[0])
+        yield 'chat_messages', get_chat_messages(request, users[0].pk, supervisor_user.pk).data
+
+        request = factory.get('/', {'page_size': students})
+        force_authenticate(request, user=supervisor_user)
+        yield 'studentleadsupervisor', SupervisorStudentDetailView.as_view()(request, user_id=supervisor_user.pk).data
+
+    def best(self, repeat, run):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
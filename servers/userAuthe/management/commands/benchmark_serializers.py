@@ -0,0 +1,78 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from chat.models import ChatMessage
+from chat.serializers import ChatMessageSerializer
+from members.models import ProjectParticipants
+from members.serializers import ProjectParticipantsSerializer
+from projectChapters.models import File
+from projectChapters.serializers import FileSerializer
+from userAuthe.compiled import compiled_serializer
+from userAuthe.models import StudentLead, Supervisor, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Rows/second of the DRF and compiled serializers behind the chat thread, participants "
+        "and chapter file list endpoints. Works on generated rows and rolls them back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help="Rows per endpoint.")
+        parser.add_argument('--repeat', type=int, default=3, help="Best of this many runs.")
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with transaction.atomic():
+            user = User.objects.create(username='benchmark-serializers', email='benchmark@example.com')
+            supervisor = Supervisor.objects.create(user=User.objects.create(username='benchmark-supervisor'))
+            student_lead = StudentLead.objects.create(user=user, supervisor=supervisor)
+            ChatMessage.objects.bulk_create([
+                ChatMessage(user=user, student_lead=student_lead, supervisor=supervisor, content=f'Message {index}')
+                for index in range(rows)
+            ])
+            ProjectParticipants.objects.bulk_create([
+                ProjectParticipants(user=user, first_name='First', last_name=f'Last {index}', admision_no=str(index),
+                                    programme='BSc', mail=f'{index}@example.com')
+                for index in range(rows)
+            ])
+            File.objects.bulk_create([
+                File(user=user, chapter_name=f'Chapter {index % 10}', name=f'File {index}', file=f'chapter_uploads_files/{index}.pdf')
+                for index in range(rows)
+            ])
+
+            request = Request(APIRequestFactory().get('/'))
+            cases = [
+                ('chat_messages', ChatMessageSerializer,
+                 ChatMessage.objects.filter(student_lead=student_lead, supervisor=supervisor).order_by('created_at', 'id')),
+                ('members/view', ProjectParticipantsSerializer, ProjectParticipants.objects.filter(user=user)),
+                ('chapters/files_list', FileSerializer, File.objects.filter(user=user)),
+            ]
+            for endpoint, serializer_class, queryset in cases:
+                drf = self.best(options['repeat'], lambda: serializer_class(
+                    queryset.select_related('user') if serializer_class is not FileSerializer else queryset,
+                    many=True, context={'request': request}
+                ).data)
+                fast = self.best(options['repeat'], lambda: compiled_serializer(serializer_class, request).serialize(
+                    queryset, request
+                ))
+                same = JSONRenderer().render(drf[1]) == JSONRenderer().render(fast[1])
+                self.stdout.write(
+                    f"{endpoint:22} DRF {rows / drf[0]:>10,.0f} rows/s   compiled {rows / fast[0]:>10,.0f} rows/s"
+                    f"   x{drf[0] / fast[0]:.1f}   {'identical' if same else 'DIFFERENT OUTPUT'}"
+                )
+
+            transaction.set_rollback(True)
+
+    def best(self, repeat, render):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            data = render()
+            timings.append(time.perf_counter() - started)
+        return min(timings), data
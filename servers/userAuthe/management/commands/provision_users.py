@@ -0,0 +1,50 @@
+import json
+import os
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from userAuthe.provisioning import BATCH_SIZE, FORMATS, detect_format, parse_rows, provision_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users with their supervisor/student profiles from a CSV or NDJSON file. "
+        "Columns/keys: username, email, password, role, first_name, last_name, department, "
+        "programme, supervisor (the supervisor's username)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or - for stdin.")
+        parser.add_argument(
+            '--input-format', choices=FORMATS, default=None,
+            help="Input format (default: from the file extension, .csv or NDJSON otherwise).",
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Users inserted per transaction.")
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help="Password hashing processes (default: PROVISIONING_WORKERS, else one per CPU).",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Validate only.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            if path == '-':
+                text = sys.stdin.read()
+            else:
+                with open(path, encoding='utf-8-sig') as fh:
+                    text = fh.read()
+        except OSError as exc:
+            raise CommandError(exc)
+
+        rows = parse_rows(text, options['input_format'] or detect_format(path))
+        workers = options['workers'] or settings.PROVISIONING_WORKERS or os.cpu_count() or 1
+        results = provision_users(rows, options['batch_size'], workers, options['dry_run'])
+
+        failed = [result for result in results if result['status'] == 'invalid']
+        for result in failed:
+            self.stderr.write(f"Row {result['index'] + 1}: {json.dumps(result['errors'])}")
+        verb = "Validated" if options['dry_run'] else "Created"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(results) - len(failed)} users, {len(failed)} rows failed."))
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from userAuthe.token_store import purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding and blacklisted refresh tokens in small chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help="Tokens deleted per transaction.",
+        )
+        parser.add_argument(
+            '--max-chunks', type=int, default=None,
+            help="Stop after this many chunks (default: until none are left).",
+        )
+        parser.add_argument(
+            '--grace-minutes', type=int, default=0,
+            help="Keep tokens that expired less than this many minutes ago.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_tokens(
+            options['chunk_size'], options['max_chunks'], timedelta(minutes=options['grace_minutes'])
+        )
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} expired tokens."))
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.5 on 2026-10-18 17:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userAuthe', '0017_delete_passwordresettoken'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentlead',
+            index=models.Index(fields=['supervisor', 'last_name', 'first_name'], name='studentlead_sup_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentlead',
+            index=models.Index(fields=['supervisor', 'first_name'], name='studentlead_sup_first_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentlead',
+            index=models.Index(fields=['supervisor', 'programme'], name='studentlead_sup_prog_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:32
+
+import userAuthe.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userAuthe', '0018_studentlead_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', userAuthe.models.UserManager()),
+            ],
+        ),
+    ]
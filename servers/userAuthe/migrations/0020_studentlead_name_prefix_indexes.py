@@ -0,0 +1,22 @@
+# Generated by Django 5.1.5 on 2026-10-18 18:59
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userAuthe', '0019_alter_user_managers'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentlead',
+            index=models.Index(models.F('supervisor'), django.db.models.functions.text.Lower('first_name'), name='studentlead_sup_lfirst_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentlead',
+            index=models.Index(models.F('supervisor'), django.db.models.functions.text.Lower('last_name'), name='studentlead_sup_llast_idx'),
+        ),
+    ]
@@ -1,5 +1,27 @@
-from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.contrib.auth.models import AbstractUser, UserManager as BaseUserManager
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Lower
+
+
+class UserQuerySet(models.QuerySet):
+
+    def update(self, **kwargs):
+        # No post_save for the authentication cache to hear (also covers bulk_update()),
+        # so drop the affected users' cached tokens here
+        from .authentication import AUTH_NEUTRAL_FIELDS, invalidate_users
+
+        if set(kwargs) <= AUTH_NEUTRAL_FIELDS:
+            return super().update(**kwargs)
+        user_ids = list(self.values_list('pk', flat=True))
+        rows = super().update(**kwargs)
+        transaction.on_commit(lambda: invalidate_users(user_ids), using=self.db)
+        return rows
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
+    pass
+
 
 class User(AbstractUser):
     ROLE_CHOICES = [
@@ -8,10 +30,64 @@ class User(AbstractUser):
     ]
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='student')
 
+    objects = UserManager()
+
     def __str__(self):
         return self.username
 
-class Supervisor(models.Model):
+
+class DirtyFieldsMixin:
+    """
+    Remembers the column values an instance was loaded or last saved with, so
+    save() only writes the columns that changed and skips the UPDATE when
+    none did.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_values = dict(zip(field_names, values))
+        return instance
+
+    def get_dirty_fields(self):
+        saved = getattr(self, '_saved_values', None)
+        deferred = self.get_deferred_fields()
+        return {
+            field.attname for field in self._meta.concrete_fields
+            if field.attname not in deferred and (
+                saved is None or field.attname not in saved or getattr(self, field.attname) != saved[field.attname]
+            )
+        }
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert') and getattr(self, '_saved_values', None) is not None:
+            fields = self.get_dirty_fields() - {self._meta.pk.attname}
+            if kwargs.get('update_fields') is not None:
+                fields &= {self._meta.get_field(name).attname for name in kwargs['update_fields']}
+            if not fields:
+                return
+            kwargs['update_fields'] = fields
+        super().save(*args, **kwargs)
+        self._remember_values()
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using, fields, from_queryset)
+        self._remember_values(fields)
+
+    def _remember_values(self, fields=None):
+        if fields is not None:
+            # May also name prefetched relations, which aren't columns
+            fields = {field.attname for field in self._meta.concrete_fields if {field.name, field.attname} & set(fields)}
+        deferred = self.get_deferred_fields()
+        saved = getattr(self, '_saved_values', None) or {}
+        saved.update({
+            field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields
+            if field.attname not in deferred and (fields is None or field.attname in fields)
+        })
+        self._saved_values = saved
+
+
+class Supervisor(DirtyFieldsMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
     first_name = models.CharField(max_length=100, null=True, blank=True)
     last_name = models.CharField(max_length=100, null=True, blank=True)
@@ -23,14 +99,15 @@ class Supervisor(models.Model):
         verbose_name = "Supervisor"
 
     def save(self, *args, **kwargs):
-        self.user.role = 'supervisor'  # Ensure role is always 'supervisor'
-        self.user.save()
+        if self.user.role != 'supervisor':
+            self.user.role = 'supervisor'  # Ensure role is always 'supervisor'
+            self.user.save(update_fields=['role'])
         super().save(*args, **kwargs)
     
     def __str__(self):
         return self.user.username
 
-class StudentLead(models.Model):
+class StudentLead(DirtyFieldsMixin, models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
     supervisor = models.ForeignKey(Supervisor, on_delete=models.CASCADE, related_name="students", null=True, blank=True)
     first_name = models.CharField(max_length=100, null=True, blank=True)
@@ -41,10 +118,20 @@ class StudentLead(models.Model):
         return f"{self.first_name} {self.last_name} - {self.programme}"
     class Meta:
         verbose_name = "Student Lead"
+        indexes = [
+            # A supervisor's students by name (default listing order) or programme
+            models.Index(fields=['supervisor', 'last_name', 'first_name'], name='studentlead_sup_name_idx'),
+            models.Index(fields=['supervisor', 'first_name'], name='studentlead_sup_first_idx'),
+            models.Index(fields=['supervisor', 'programme'], name='studentlead_sup_prog_idx'),
+            # ?name= prefix filter, as ranges over the lowercased names
+            models.Index(F('supervisor'), Lower('first_name'), name='studentlead_sup_lfirst_idx'),
+            models.Index(F('supervisor'), Lower('last_name'), name='studentlead_sup_llast_idx'),
+        ]
 
     def save(self, *args, **kwargs):
-        self.user.role = 'student'  # Ensure role is always 'student'
-        self.user.save()
+        if self.user.role != 'student':
+            self.user.role = 'student'  # Ensure role is always 'student'
+            self.user.save(update_fields=['role'])
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -0,0 +1,42 @@
+from django.core.exceptions import PermissionDenied
+
+
+def _missing(queryset, message, lookup):
+    # Only reached when the scoped statement matched nothing: an EXISTS tells
+    # "someone else's" (403) from "not there" (404) without loading the row
+    if queryset.filter(**lookup).exists():
+        raise PermissionDenied(message)
+    raise queryset.model.DoesNotExist
+
+
+def get_owned(queryset, user, message, owner_field='user', **lookup):
+    """
+    The object matching `lookup` if `user` owns it, fetched with the owner in
+    the WHERE clause. Raises PermissionDenied(message) if it belongs to
+    someone else and the model's DoesNotExist if there is no such object.
+    """
+    try:
+        return queryset.get(**lookup, **{owner_field: user})
+    except queryset.model.DoesNotExist:
+        _missing(queryset, message, lookup)
+
+
+def update_owned(queryset, user, values, message, owner_field='user', **lookup):
+    """
+    Set `values` on the object matching `lookup` if `user` owns it, in one
+    conditional UPDATE. Raises like get_owned(). Sends no signals.
+    """
+    scoped = queryset.filter(**lookup, **{owner_field: user})
+    if not (scoped.update(**values) if values else scoped.exists()):
+        _missing(queryset, message, lookup)
+
+
+def delete_owned(queryset, user, message, owner_field='user', **lookup):
+    """
+    Delete the object matching `lookup` if `user` owns it, with the owner in
+    the DELETE's lookup. Raises like get_owned(). A regular QuerySet.delete(),
+    so cascades and delete signals run as usual.
+    """
+    deleted, _ = queryset.filter(**lookup, **{owner_field: user}).delete()
+    if not deleted:
+        _missing(queryset, message, lookup)
@@ -0,0 +1,23 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    # ?page=<n>&page_size=<n>, shared by the list endpoints of every app
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+def positive_int_param(request, name, default):
+    """?<name>= as a positive integer, `default` when absent; anything else is a 400."""
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        value = 0
+    if value < 1:
+        raise ValidationError({name: 'A positive integer is required.'})
+    return value
@@ -0,0 +1,234 @@
+import csv
+import io
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from . import directory
+from .models import StudentLead, Supervisor, User
+
+
+BATCH_SIZE = 1000
+FORMATS = ('csv', 'ndjson')
+# Rows with a password the admin API hashes within one request; larger onboarding goes through
+# the provision_users command
+MAX_API_PASSWORDS = 100
+
+_hash_executor = None
+_hash_executor_lock = threading.Lock()
+
+
+class ProvisionUserSerializer(serializers.Serializer):
+    # One input row; usernames and supervisor references are checked for the whole input at once
+    username = serializers.CharField(max_length=150, validators=User._meta.get_field('username').validators)
+    email = serializers.EmailField(required=False, allow_blank=True, default='')
+    password = serializers.CharField(required=False, min_length=8, write_only=True)
+    role = serializers.ChoiceField(choices=User.ROLE_CHOICES, default='student')
+    first_name = serializers.CharField(max_length=100, required=False)
+    last_name = serializers.CharField(max_length=100, required=False)
+    department = serializers.CharField(max_length=255, required=False)
+    programme = serializers.CharField(max_length=255, required=False)
+    supervisor = serializers.CharField(max_length=150, required=False, help_text="Username of the student's supervisor")
+
+
+def detect_format(filename):
+    extension = os.path.splitext(filename or '')[1].lower()
+    return 'csv' if extension == '.csv' else 'ndjson'
+
+
+def parse_rows(text, fmt):
+    """
+    Rows of a CSV (with a header line) or NDJSON document as dicts. Empty CSV
+    cells are left out; an NDJSON line that isn't a JSON object becomes a
+    ValueError, reported against that row.
+    """
+    if fmt == 'csv':
+        return [
+            {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+            for row in csv.DictReader(io.StringIO(text))
+        ]
+
+    rows = []
+    for number, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            row = ValueError(f"Line {number} is not valid JSON: {exc}")
+        if not isinstance(row, (dict, ValueError)):
+            row = ValueError(f"Line {number} is not a JSON object.")
+        rows.append(row)
+    return rows
+
+
+def _thread_executor():
+    global _hash_executor
+    if _hash_executor is None:
+        with _hash_executor_lock:
+            if _hash_executor is None:
+                _hash_executor = ThreadPoolExecutor(
+                    max_workers=settings.PROVISIONING_HASH_THREADS, thread_name_prefix='password-hash'
+                )
+    return _hash_executor
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    make_password() over `passwords`. With `workers` (the provision_users
+    command) they are spread across a pool of that many processes. Otherwise
+    they go through one small thread pool shared by the whole process, so
+    concurrent requests can't multiply the hashing work. The default hashers
+    release the GIL while hashing.
+    """
+    if not workers:
+        return list(_thread_executor().map(make_password, passwords))
+    if workers <= 1 or len(passwords) < 2 * workers:
+        return [make_password(password) for password in passwords]
+
+    # spawn rather than fork: Django may already hold threads (brokers, token purges).
+    # Workers inherit DJANGO_SETTINGS_MODULE, so they hash with the same PASSWORD_HASHERS.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'), initializer=django.setup) as executor:
+        return list(executor.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def _existing_usernames(usernames):
+    usernames = list(usernames)
+    existing = set()
+    for start in range(0, len(usernames), BATCH_SIZE):
+        existing.update(User.objects.filter(
+            username__in=usernames[start:start + BATCH_SIZE]
+        ).values_list('username', flat=True))
+    return existing
+
+
+def _profile(user, data, supervisor_ids):
+    if data['role'] == 'supervisor':
+        return Supervisor(
+            user=user,
+            first_name=data.get('first_name'),
+            last_name=data.get('last_name'),
+            department=data.get('department'),
+        )
+    return StudentLead(
+        user=user,
+        supervisor_id=supervisor_ids.get(data.get('supervisor')),
+        first_name=data.get('first_name'),
+        last_name=data.get('last_name'),
+        programme=data.get('programme'),
+    )
+
+
+def _insert(batch, supervisor_ids):
+    # batch: [(index, data, password hash)]; returns {index: user or IntegrityError}
+    users = [
+        User(username=data['username'], email=data['email'], password=password, role=data['role'])
+        for _, data, password in batch
+    ]
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            profiles = [_profile(user, data, supervisor_ids) for user, (_, data, _) in zip(users, batch)]
+            Supervisor.objects.bulk_create([profile for profile in profiles if isinstance(profile, Supervisor)])
+            StudentLead.objects.bulk_create([profile for profile in profiles if isinstance(profile, StudentLead)])
+        return {index: user for user, (index, _, _) in zip(users, batch)}
+    except IntegrityError:
+        if len(batch) == 1:
+            raise
+
+    # Someone else took a username meanwhile: fall back to one row at a time
+    inserted = {}
+    for row in batch:
+        try:
+            inserted.update(_insert([row], supervisor_ids))
+        except IntegrityError as exc:
+            inserted[row[0]] = exc
+    return inserted
+
+
+def provision_users(rows, batch_size=BATCH_SIZE, workers=None, dry_run=False):
+    """
+    Create users with their Supervisor/StudentLead profiles from parsed rows.
+
+    Returns one result per row, in order: {"index", "status": "created", "id",
+    "username"} or {"index", "status": "invalid", "errors"}. Valid rows are
+    inserted in transactions of `batch_size`, supervisors first so students
+    can reference supervisors from the same input; other rows are unaffected
+    by an invalid one. Rows without a password get an unusable one. See
+    hash_passwords() for `workers`.
+    """
+    results = [None] * len(rows)
+    valid = []
+    for index, row in enumerate(rows):
+        if isinstance(row, ValueError):
+            results[index] = {'index': index, 'status': 'invalid', 'errors': {'non_field_errors': [str(row)]}}
+            continue
+        serializer = ProvisionUserSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = {'index': index, 'status': 'invalid', 'errors': serializer.errors}
+
+    taken = _existing_usernames({data['username'] for _, data in valid})
+    new_supervisors = {data['username'] for _, data in valid if data['role'] == 'supervisor'}
+    referenced = {data['supervisor'] for _, data in valid if data.get('supervisor')}
+    supervisor_ids = dict(Supervisor.objects.filter(user__username__in=referenced).values_list('user__username', 'pk'))
+
+    pending = []
+    seen = set()
+    for index, data in valid:
+        errors = {}
+        if data['username'] in taken:
+            errors['username'] = ["Username is already taken."]
+        elif data['username'] in seen:
+            errors['username'] = ["Username appears more than once in this input."]
+        supervisor = data.get('supervisor')
+        if supervisor and data['role'] == 'student' and supervisor not in supervisor_ids and supervisor not in new_supervisors:
+            errors['supervisor'] = [f'No supervisor with username "{supervisor}".']
+        seen.add(data['username'])
+        if errors:
+            results[index] = {'index': index, 'status': 'invalid', 'errors': errors}
+        else:
+            pending.append((index, data))
+
+    if dry_run or not pending:
+        for index, data in pending:
+            results[index] = {'index': index, 'status': 'valid', 'username': data['username']}
+        return results
+
+    hashes = hash_passwords([data.get('password') for _, data in pending], workers)
+    rows = [(index, data, password) for (index, data), password in zip(pending, hashes)]
+
+    # Supervisors first, so students can be linked to supervisors from the same input
+    for role in ('supervisor', 'student'):
+        role_rows = [row for row in rows if row[1]['role'] == role]
+        if role == 'student':
+            role_rows, unresolved = [], role_rows
+            for index, data, password in unresolved:
+                if data.get('supervisor') and data['supervisor'] not in supervisor_ids:
+                    results[index] = {'index': index, 'status': 'invalid', 'errors': {
+                        'supervisor': [f'Supervisor "{data["supervisor"]}" could not be created.']
+                    }}
+                else:
+                    role_rows.append((index, data, password))
+
+        for start in range(0, len(role_rows), batch_size):
+            for index, outcome in _insert(role_rows[start:start + batch_size], supervisor_ids).items():
+                if isinstance(outcome, IntegrityError):
+                    results[index] = {'index': index, 'status': 'invalid', 'errors': {'non_field_errors': [str(outcome)]}}
+                    continue
+                results[index] = {'index': index, 'status': 'created', 'id': outcome.pk, 'username': outcome.username}
+                if role == 'supervisor':
+                    supervisor_ids[outcome.username] = outcome.pk
+
+    if any(data['role'] == 'supervisor' for _, data in pending):
+        transaction.on_commit(directory.bump_version)
+    return results
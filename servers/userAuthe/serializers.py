@@ -1,6 +1,7 @@
 
 from rest_framework import serializers
 from .models import User, Supervisor, StudentLead, StudentProject, ProjectMembers
+from .fieldsets import DynamicFieldsMixin
 
 
 
@@ -27,14 +28,14 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
 
 
 # User Serializer (Optional - if you need basic user data)
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'role']
         
 
 # Supervisor Profile Serializer
-class SupervisorSerializer(serializers.ModelSerializer):
+class SupervisorSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)  # Include user details in response
 
     class Meta:
@@ -66,7 +67,7 @@ class SupervisorSerializer(serializers.ModelSerializer):
 
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)  # Include user details in response
     class Meta:
         model = StudentProject
@@ -84,7 +85,7 @@ class ProjectSerializer(serializers.ModelSerializer):
         )
         return project
 
-class StudentMemberSerializer(serializers.ModelSerializer):
+class StudentMemberSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)  # Include user details in response
     class Meta:
         model = ProjectMembers
@@ -107,7 +108,7 @@ class StudentMemberSerializer(serializers.ModelSerializer):
 
 
         #  Student Lead Profile Serializer
-class StudentLeadSerializer(serializers.ModelSerializer):
+class StudentLeadSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     supervisor = SupervisorSerializer(read_only=True)
     project = ProjectSerializer(read_only=True)
@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from chat.signals import conversation_changed
+from . import directory
+from .authentication import AUTH_NEUTRAL_FIELDS, invalidate_user
+from .dashboard import invalidate_dashboard
+from .models import ProjectMembers, StudentLead, StudentProject, Supervisor, User
+
+
+@receiver(post_save, sender=Supervisor)
+@receiver(post_delete, sender=Supervisor)
+def invalidate_supervisor_directory(sender, **kwargs):
+    # After commit, so a concurrent rebuild can't cache the old rows under the new version
+    transaction.on_commit(directory.bump_version)
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_authentication(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields and set(update_fields) <= AUTH_NEUTRAL_FIELDS):
+        return
+    transaction.on_commit(lambda: invalidate_user(instance.pk))
+
+
+@receiver(post_delete, sender=User)
+def forget_deleted_user(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_user(instance.pk))
+
+
+@receiver(post_save, sender=StudentLead)
+@receiver(post_delete, sender=StudentLead)
+@receiver(post_save, sender=StudentProject)
+@receiver(post_delete, sender=StudentProject)
+@receiver(post_save, sender=ProjectMembers)
+@receiver(post_delete, sender=ProjectMembers)
+# By label, so this module doesn't import the apps built on top of userAuthe
+@receiver(post_save, sender='members.ProjectParticipants')
+@receiver(post_delete, sender='members.ProjectParticipants')
+@receiver(post_save, sender='projectChapters.File')
+@receiver(post_delete, sender='projectChapters.File')
+def invalidate_student_dashboard(sender, instance, **kwargs):
+    # All of these belong to the student through their user_id
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_dashboard(user_id))
+
+
+@receiver(post_save, sender='chat.ChatMessage')
+def invalidate_chat_dashboard(sender, instance, **kwargs):
+    # Edits of a conversation's last message; new messages also arrive as conversation_changed
+    student_lead_id = instance.student_lead_id
+    transaction.on_commit(lambda: invalidate_dashboard(student_lead_id))
+
+
+@receiver(conversation_changed)
+def invalidate_conversation_dashboard(sender, student_lead_id, **kwargs):
+    # Bulk inserts, read receipts and archiving, which send no model signals
+    transaction.on_commit(lambda: invalidate_dashboard(student_lead_id))
+
+
+@receiver(post_save, sender=Supervisor)
+def invalidate_supervised_dashboards(sender, instance, created, **kwargs):
+    # The supervisor's profile is part of each of their students' dashboards
+    if created:
+        return
+    student_ids = list(instance.students.values_list('user_id', flat=True))
+    transaction.on_commit(lambda: [invalidate_dashboard(user_id) for user_id in student_ids])
@@ -1,3 +1,322 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .factories import make_student_lead, make_supervisor
+from .models import StudentLead, StudentProject, Supervisor, User
+from .provisioning import MAX_API_PASSWORDS, provision_users
+from .token_store import StoredRefreshToken, TokenStore, bump_blacklist_version, token_store
+
+
+class SupervisorStudentDetailViewTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.supervisor = make_supervisor(first_name='Ada', last_name='Lovelace')
+
+    def add_students(self, count, with_projects=True):
+        for _ in range(count):
+            index = StudentLead.objects.count()
+            student_lead = make_student_lead(self.supervisor, username=f'student{index}', first_name='S', last_name=f'{index:04d}')
+            if with_projects:
+                StudentProject.objects.create(user=student_lead.user, title=f'Project {index}')
+
+    def get(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/user/studentleadsupervisor/{self.supervisor.user_id}/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+    def test_query_count_does_not_grow_with_cohort(self):
+        self.add_students(3)
+        small, small_queries = self.get()
+
+        self.add_students(40)
+        self.add_students(5, with_projects=False)
+        large, large_queries = self.get()
+
+        self.assertEqual(len(small['students']), 3)
+        self.assertEqual(len(large['students']), 48)
+        self.assertEqual(small_queries, large_queries)
+        self.assertLessEqual(large_queries, 3)
+
+    def test_students_include_their_project(self):
+        self.add_students(1)
+        self.add_students(1, with_projects=False)
+        data, _ = self.get()
+
+        with_project, without_project = data['students']
+        self.assertEqual([project['title'] for project in with_project['projects']], ['Project 0'])
+        self.assertEqual(with_project['projects'][0]['user']['username'], 'student0')
+        self.assertEqual(without_project['projects'], [])
+
+    def test_pagination(self):
+        self.add_students(5)
+        data, _ = self.get(page=2, page_size=2)
+
+        self.assertEqual(data['count'], 5)
+        self.assertEqual([student['last_name'] for student in data['students']], ['0002', '0003'])
+        self.assertIsNotNone(data['next'])
+        self.assertIsNotNone(data['previous'])
+
+
+class SupervisorStudentsTests(TestCase):
+
+    def setUp(self):
+        profile = make_supervisor()
+        other = make_supervisor(username='other')
+        for username, supervisor, first_name, last_name in [
+            ('ada', profile, 'Ada', 'Lovelace'),
+            ('alan', profile, 'Alan', 'Turing'),
+            ('grace', profile, 'Grace', 'ADAMS'),
+            ('edsger', profile, None, 'Dijkstra'),
+            ('outside', other, 'Ada', 'Byron'),
+        ]:
+            make_student_lead(supervisor, username=username, first_name=first_name, last_name=last_name)
+        self.client = APIClient()
+        self.client.force_authenticate(profile.user)
+
+    def names(self, **params):
+        response = self.client.get('/user/supervisor/students/', params)
+        self.assertEqual(response.status_code, 200)
+        return [student['last_name'] for student in response.json()['results']]
+
+    def test_name_filters_first_or_last_name_prefixes_case_insensitively(self):
+        self.assertEqual(self.names(name='ada'), ['ADAMS', 'Lovelace'])
+        self.assertEqual(self.names(name='DIJ'), ['Dijkstra'])
+        self.assertEqual(self.names(name='al', ordering='-last_name'), ['Turing'])
+        self.assertEqual(self.names(name='zz'), [])
+        self.assertEqual(len(self.names()), 4)
+
+
+class StudentLeadDetailFieldsetTests(TestCase):
+
+    def setUp(self):
+        self.student = make_student_lead(make_supervisor(), first_name='Ada', last_name='Lovelace').user
+        StudentProject.objects.create(user=self.student, title='Engines', description='Analytical')
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def test_fields_trim_the_student_lead_and_sections(self):
+        for path in ('/user/onestudentlead/', '/user/view_project/'):
+            data = self.client.get(f'{path}{self.student.pk}/', {'fields': 'first_name,projects.title'}).json()
+            self.assertEqual(data['student_lead'], {'first_name': 'Ada'})
+            self.assertEqual(data['projects'], [{'title': 'Engines'}])
+
+        data = self.client.get(f'/members/view/{self.student.pk}/', {'fields': 'last_name', 'expand': 'supervisor'}).json()
+        self.assertEqual(data['student_lead'], {'last_name': 'Lovelace'})
+
+    def test_without_a_selection_the_payload_is_complete(self):
+        data = self.client.get(f'/user/onestudentlead/{self.student.pk}/').json()
+        self.assertEqual(data['student_lead']['user']['username'], 'student')
+        self.assertEqual(data['projects'][0]['user']['username'], 'student')
+
+
+class ProfileWriteTests(TestCase):
+    """Write counts of the create-profile endpoints (update_or_create under the hood)."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.supervisor_user = User.objects.create_user(username='supervisor', role='supervisor')
+        self.student_user = User.objects.create_user(username='student')
+
+    def post(self, user, url, data):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, 201)
+        return [query['sql'] for query in queries if query['sql'].startswith(('INSERT', 'UPDATE'))]
+
+    def post_supervisor(self, **data):
+        return self.post(self.supervisor_user, '/user/create-profile/supervisor/', {
+            'first_name': 'Ada', 'last_name': 'Lovelace', 'department': 'CS', **data
+        })
+
+    def post_student(self, **data):
+        return self.post(self.student_user, '/user/create-profile/studentlead/', {
+            'supervisor': self.supervisor_user.id, 'first_name': 'Alan', 'last_name': 'Turing', 'programme': 'BSc', **data
+        })
+
+    def test_supervisor_profile_writes(self):
+        writes = self.post_supervisor()
+        self.assertEqual(len(writes), 1)
+        self.assertTrue(writes[0].startswith('INSERT INTO "userAuthe_supervisor"'))
+
+        self.assertEqual(self.post_supervisor(), [])
+
+        writes = self.post_supervisor(department='Maths')
+        self.assertEqual(len(writes), 1)
+        self.assertIn('"department"', writes[0])
+        self.assertNotIn('"first_name"', writes[0])
+        self.assertEqual(Supervisor.objects.get().department, 'Maths')
+
+    def test_student_profile_writes(self):
+        self.post_supervisor()
+        writes = self.post_student()
+        self.assertEqual(len(writes), 1)
+        self.assertTrue(writes[0].startswith('INSERT INTO "userAuthe_studentlead"'))
+
+        self.assertEqual(self.post_student(), [])
+
+        writes = self.post_student(programme='MSc')
+        self.assertEqual(len(writes), 1)
+        self.assertIn('"programme"', writes[0])
+        self.assertNotIn('"last_name"', writes[0])
+
+    def test_role_is_written_only_when_it_changes(self):
+        self.post_supervisor()
+        self.student_user.role = 'supervisor'
+        self.student_user.save()
+        writes = self.post_student()
+        self.assertEqual(len(writes), 2)
+        self.assertTrue(writes[0].startswith('UPDATE "userAuthe_user" SET "role" = '))
+        self.assertNotIn('"username"', writes[0])
+        self.student_user.refresh_from_db()
+        self.assertEqual(self.student_user.role, 'student')
+
+
+class CachedJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='student')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_bulk_deactivation_ends_cached_authentications(self):
+        self.assertEqual(self.client.get('/chat/inbox/').status_code, 200)
+        self.assertEqual(self.client.get('/chat/inbox/').status_code, 200)  # served from the token cache
+
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/chat/inbox/').status_code, 401)
+
+    def test_bulk_update_of_other_fields_ends_cached_authentications(self):
+        self.assertEqual(self.client.get('/chat/inbox/').status_code, 200)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.bulk_update([self.user], ['is_active'])
+        self.assertEqual(self.client.get('/chat/inbox/').status_code, 401)
+
+
+class TokenStoreTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='student', password='secret')
+
+    def test_rotation_blacklists_the_old_token_at_once(self):
+        client = APIClient()
+        refresh = client.post('/user/token/', {'username': 'student', 'password': 'secret'}).json()['refresh']
+        self.assertEqual(client.post('/user/token/refresh/', {'refresh': refresh}).status_code, 200)
+        jti = StoredRefreshToken(refresh, verify=False)['jti']
+        self.assertTrue(BlacklistedToken.objects.filter(token__jti=jti).exists())
+        self.assertEqual(client.post('/user/token/refresh/', {'refresh': refresh}).status_code, 401)
+
+    def test_other_processes_see_a_blacklisting_without_waiting_for_a_sync(self):
+        other_process = TokenStore()
+        token = StoredRefreshToken.for_user(self.user)
+        self.assertFalse(other_process.is_blacklisted(token['jti']))  # builds its filter
+
+        with self.captureOnCommitCallbacks(execute=True):
+            token_store.blacklist(token)
+        self.assertTrue(other_process.is_blacklisted(token['jti']))
+
+
+    def test_a_blacklisting_committed_behind_a_higher_id_is_still_picked_up(self):
+        other_process = TokenStore()
+        early, late = StoredRefreshToken.for_user(self.user), StoredRefreshToken.for_user(self.user)
+        self.assertFalse(other_process.is_blacklisted(early['jti']))  # builds its filter
+        outstanding = [OutstandingToken.objects.get(jti=token['jti']) for token in (early, late)]
+        # `late` commits first under a higher id, `early` only once that has been synced
+        BlacklistedToken.objects.create(id=10, token=outstanding[1])
+        bump_blacklist_version()
+        self.assertTrue(other_process.is_blacklisted(late['jti']))
+        BlacklistedToken.objects.create(id=5, token=outstanding[0])
+        bump_blacklist_version()
+        self.assertTrue(other_process.is_blacklisted(early['jti']))
+        self.assertIn(early['jti'], other_process._filter)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProvisionUsersTests(TestCase):
+
+    rows = [
+        {'username': 'student1', 'password': 'student-pass', 'supervisor': 'supervisor1', 'programme': 'BSc'},
+        {'username': 'supervisor1', 'password': 'supervisor-pass', 'role': 'supervisor', 'department': 'CS'},
+        {'username': 'student2'},
+    ]
+
+    def test_dry_run_validates_without_writing(self):
+        results = provision_users(self.rows, dry_run=True)
+        self.assertEqual([result['status'] for result in results], ['valid'] * 3)
+        self.assertFalse(User.objects.exists())
+
+    def test_profiles_are_created_and_linked(self):
+        results = provision_users(self.rows)
+        self.assertEqual([result['status'] for result in results], ['created'] * 3)
+
+        supervisor = Supervisor.objects.get(user__username='supervisor1')
+        self.assertEqual((supervisor.user.role, supervisor.department), ('supervisor', 'CS'))
+        student = StudentLead.objects.get(user__username='student1')
+        self.assertEqual((student.user.role, student.supervisor_id, student.programme), ('student', supervisor.pk, 'BSc'))
+        self.assertTrue(student.user.check_password('student-pass'))
+        self.assertFalse(User.objects.get(username='student2').has_usable_password())
+
+    def test_existing_and_repeated_usernames_are_rejected_per_row(self):
+        User.objects.create_user(username='student1')
+        results = provision_users(self.rows + [{'username': 'student2'}, {'username': 'student3', 'supervisor': 'nobody'}])
+        self.assertEqual(
+            [result['status'] for result in results], ['invalid', 'created', 'created', 'invalid', 'invalid']
+        )
+        self.assertEqual(results[0]['errors'], {'username': ['Username is already taken.']})
+        self.assertEqual(results[3]['errors'], {'username': ['Username appears more than once in this input.']})
+        self.assertIn('supervisor', results[4]['errors'])
+        self.assertEqual(User.objects.filter(username__in=['student2', 'student3']).count(), 1)
+
+    def test_api_limits_passwords_per_request(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='admin', is_staff=True))
+        users = [{'username': f'user{index}', 'password': 'long-enough'} for index in range(MAX_API_PASSWORDS + 1)]
+        self.assertEqual(client.post('/user/register/bulk/', {'users': users}, format='json').status_code, 400)
+        self.assertEqual(client.post('/user/register/bulk/', {'users': users[:2]}, format='json').status_code, 201)
+
+
+class StudentDashboardTests(TestCase):
+
+    def setUp(self):
+        self.supervisor = make_supervisor()
+        self.student_lead = make_student_lead(self.supervisor)
+        self.student = self.student_lead.user
+        self.client = APIClient()
+        self.path = f'/user/dashboard/{self.student.pk}/'
+
+    def test_outsiders_are_refused_before_the_dashboard_is_built(self):
+        self.client.force_authenticate(User.objects.create_user(username='outsider'))
+        with mock.patch('userAuthe.views.get_dashboard') as get_dashboard:
+            self.assertEqual(self.client.get(self.path).status_code, 403)
+        get_dashboard.assert_not_called()
+
+    def test_bulk_chat_ingest_and_read_receipts_refresh_the_dashboard(self):
+        from chat.bulk import ingest_messages
+        from chat.models import ConversationSummary
+
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.get(self.path).json()['conversations'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest_messages(
+                [{'student_lead': self.student.pk, 'supervisor': self.supervisor.pk, 'content': 'hello'}],
+                self.supervisor.user,
+            )
+        conversations = self.client.get(self.path).json()['conversations']
+        self.assertEqual([conversation['unread'] for conversation in conversations], [1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ConversationSummary.mark_read(
+                self.student.pk, self.supervisor.pk, self.student.pk, conversations[0]['last_message']['id']
+            )
+        self.assertEqual(self.client.get(self.path).json()['conversations'][0]['unread'], 0)
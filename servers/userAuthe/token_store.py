@@ -0,0 +1,209 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .cache_versions import bump_version, get_version
+
+
+logger = logging.getLogger(__name__)
+
+BLACKLIST_VERSION_KEY = 'token_blacklist:version'
+
+
+class BloomFilter:
+    """Set membership with no false negatives and ~`error_rate` false positives."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.sha256(value.encode()).digest()
+        first, second = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:16], 'big')
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class TokenStore:
+    """
+    Refresh token blacklist with an in-memory front.
+
+    Blacklisting writes the BlacklistedToken row right away, so a rotated
+    token is refused by every process from the moment its rotation commits.
+    Membership checks consult a Bloom filter of blacklisted jtis and only hit
+    the database when the filter says "maybe". The filter picks up tokens
+    blacklisted by other processes as soon as the blacklist version in the
+    shared cache changes (with a per-process cache backend, within
+    TOKEN_BLACKLIST_SYNC_INTERVAL seconds) and is rebuilt from the database
+    every TOKEN_BLACKLIST_REBUILD_INTERVAL. Queries run outside the lock, one
+    refresh at a time; other checks use the filter as it is meanwhile.
+
+    Ids are handed out in order but need not commit in order, so a sync can
+    see a row while a lower id is still uncommitted. Each sync therefore
+    re-reads every id above the highest one already synced
+    TOKEN_BLACKLIST_SYNC_OVERLAP seconds ago, which no transaction that
+    short can still be holding back.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._last_id = 0
+        self._checkpoints = deque()  # (time, highest id synced by then), oldest first
+        self._floor = 0  # highest id synced at least TOKEN_BLACKLIST_SYNC_OVERLAP ago
+        self._version = None
+        self._synced_at = 0
+        self._built_at = 0
+        self._refreshing = False
+        self._purged_at = time.monotonic()
+
+    # Membership
+
+    def is_blacklisted(self, jti):
+        self._refresh()
+        with self._lock:
+            if self._filter is not None and jti not in self._filter:
+                return False
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def _refresh(self):
+        now = time.monotonic()
+        # Read before the query, so a blacklisting it misses still leaves the version stale
+        version = get_version(BLACKLIST_VERSION_KEY)
+        with self._lock:
+            rebuild = self._filter is None or now - self._built_at >= settings.TOKEN_BLACKLIST_REBUILD_INTERVAL
+            stale = version != self._version or now - self._synced_at >= settings.TOKEN_BLACKLIST_SYNC_INTERVAL
+            if self._refreshing or not (rebuild or stale):
+                return
+            self._refreshing = True
+            while self._checkpoints and now - self._checkpoints[0][0] >= settings.TOKEN_BLACKLIST_SYNC_OVERLAP:
+                self._floor = self._checkpoints.popleft()[1]
+            floor = self._floor
+        try:
+            if rebuild:
+                # Expired tokens fail verification anyway, so they are left out
+                rows = BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+            else:
+                rows = BlacklistedToken.objects.filter(id__gt=floor)
+            rows = list(rows.order_by('id').values_list('id', 'token__jti').iterator(chunk_size=5000))
+
+            with self._lock:
+                if rebuild:
+                    self._filter = BloomFilter(max(settings.TOKEN_BLACKLIST_FILTER_CAPACITY, 2 * len(rows)))
+                    self._built_at = now
+                for pk, jti in rows:
+                    if rebuild or jti not in self._filter:  # re-read rows are already in
+                        self._add(jti)
+                    self._last_id = max(self._last_id, pk)
+                self._checkpoints.append((now, self._last_id))
+                self._version = version
+                self._synced_at = now
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _add(self, jti):
+        self._filter.add(jti)
+        if self._filter.count > self._filter.capacity:
+            self._built_at = 0  # over capacity: rebuild bigger on the next check
+
+    # Blacklisting
+
+    def blacklist(self, token):
+        payload = token.payload
+        jti = payload[api_settings.JTI_CLAIM]
+        with transaction.atomic():
+            outstanding, _ = OutstandingToken.objects.get_or_create(jti=jti, defaults={
+                'user_id': payload.get(api_settings.USER_ID_CLAIM),
+                'token': str(token),
+                'created_at': token.current_time,
+                'expires_at': datetime_from_epoch(payload['exp']),
+            })
+            BlacklistedToken.objects.get_or_create(token=outstanding)
+            transaction.on_commit(bump_blacklist_version)
+        with self._lock:
+            if self._filter is not None:
+                self._add(jti)
+        self._maybe_purge()
+
+    # Housekeeping
+
+    def _maybe_purge(self):
+        with self._lock:
+            if time.monotonic() - self._purged_at < settings.TOKEN_PURGE_INTERVAL:
+                return
+            self._purged_at = time.monotonic()
+        threading.Thread(target=self._purge_in_background, name='token-purge', daemon=True).start()
+
+    def _purge_in_background(self):
+        try:
+            purge_expired_tokens(max_chunks=settings.TOKEN_PURGE_MAX_CHUNKS)
+        except Exception:
+            logger.exception("Failed to purge expired tokens")
+        finally:
+            close_old_connections()
+
+
+def bump_blacklist_version():
+    bump_version(BLACKLIST_VERSION_KEY)
+
+
+def purge_expired_tokens(chunk_size=1000, max_chunks=None, grace=timedelta(0)):
+    """
+    Delete expired outstanding tokens and their blacklist entries in chunks of
+    `chunk_size`, each in its own short transaction. Returns the number of
+    outstanding tokens deleted.
+    """
+    cutoff = timezone.now() - grace
+    deleted = 0
+    chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lt=cutoff).order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            OutstandingToken.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+        chunks += 1
+    return deleted
+
+
+token_store = TokenStore()
+
+
+class StoredRefreshToken(RefreshToken):
+    """RefreshToken whose blacklist goes through `token_store`."""
+
+    def check_blacklist(self):
+        if token_store.is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        token_store.blacklist(self)
@@ -2,11 +2,7 @@
 
 from django.urls import path
 from . import views
-from .views import MyTokenObtainPairView, UserRegisterView
-
-from rest_framework_simplejwt.views import (
-    TokenRefreshView,
-)
+from .views import MyTokenObtainPairView, MyTokenRefreshView, UserRegisterView
 
 
 from django.urls import path
@@ -18,14 +14,17 @@ urlpatterns = [
     path('', views.getRoutes),
 
     path('register/', UserRegisterView.as_view(), name='user-register'),
+    path('register/bulk/', views.provision_users_bulk, name='user-register-bulk'),
     path('token/', MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/refresh/', MyTokenRefreshView.as_view(), name='token_refresh'),
 
 
 
     path('student/profile/', student_lead_detail, name='student-profile'),
     path('student/project/', create_project, name='create-project'),
     path('supervisor/students/', supervisor_students, name='supervisor-students'),
+    path('export/students/', views.export_students, name='export-students'),
+    path('export/projects/', views.export_projects, name='export-projects'),
 
 
     path('create-profile/supervisor/', views.CreateSupervisorAPIView.as_view(), name='create_supervisor_profile'),
@@ -38,6 +37,7 @@ urlpatterns = [
     # personal data
     path('onestudentlead/<int:user_id>/', views.StudentLeadDetailView.as_view(), name='one_student_leads'),
     path('onesupervisor/<int:user_id>/', views.SupervisorDetailView.as_view(), name='one_supervisor'),
+    path('dashboard/<int:user_id>/', views.student_dashboard, name='student_dashboard'),
 
     # project and members.
     path('create_project/', views.create_project, name='create_project'),
@@ -1,5 +1,9 @@
+import csv
+
 from django.core.exceptions import ObjectDoesNotExist
 from django.shortcuts import get_object_or_404
+from django.db.models import Q
+from django.db.models.functions import Lower
 from django.http import JsonResponse
 
 from rest_framework.response import Response
@@ -8,6 +12,7 @@ from rest_framework.generics import RetrieveAPIView
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import NotFound
 
 from .models import StudentProject, StudentLead, ProjectMembers, Supervisor, User
 from .serializers import (
@@ -17,6 +22,8 @@ from .serializers import (
     UserSerializer,
     SupervisorSerializer
 )
+from .pagination import StandardResultsSetPagination
+from .token_store import StoredRefreshToken
 
 
 
@@ -27,17 +34,20 @@ from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 
 from rest_framework.views import APIView
 from .serializers import UserRegistrationSerializer
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
+from .provisioning import FORMATS, MAX_API_PASSWORDS, detect_format, parse_rows, provision_users
 
 
 
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = StoredRefreshToken
+
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
@@ -51,6 +61,15 @@ class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
 
 
+class MyTokenRefreshSerializer(TokenRefreshSerializer):
+    # Blacklist checks and rotation go through the in-memory token store
+    token_class = StoredRefreshToken
+
+
+class MyTokenRefreshView(TokenRefreshView):
+    serializer_class = MyTokenRefreshSerializer
+
+
 @api_view(['GET'])
 def getRoutes(request):
     routes = [
@@ -82,6 +101,50 @@ class UserRegisterView(APIView):
         return Response(serializer.errors, status=400)
 
 
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def provision_users_bulk(request):
+    """
+    Bulk variant of UserRegisterView for onboarding: a CSV or NDJSON upload
+    in "file" (format from its extension or "input_format"), or a JSON body
+    {"users": [{username, password, role, first_name, ...}, ...]}.
+    Add ?dry_run=1 to only validate. Imports with more than MAX_API_PASSWORDS
+    passwords belong in the provision_users command.
+    """
+    upload = request.FILES.get('file')
+    if upload is not None:
+        fmt = request.data.get('input_format') or detect_format(upload.name)
+        if fmt not in FORMATS:
+            return Response({"error": f"Unsupported input format '{fmt}'"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            rows = parse_rows(upload.read().decode('utf-8-sig'), fmt)
+        except (UnicodeDecodeError, csv.Error) as exc:
+            return Response({"error": f"Could not read the file: {exc}"}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        rows = request.data.get('users') if isinstance(request.data, dict) else request.data
+    if not isinstance(rows, list) or not rows:
+        return Response({"error": "Expected a non-empty list of users"}, status=status.HTTP_400_BAD_REQUEST)
+
+    dry_run = request.query_params.get('dry_run') in ('1', 'true')
+    passwords = sum(1 for row in rows if isinstance(row, dict) and row.get('password'))
+    if passwords > MAX_API_PASSWORDS and not dry_run:
+        return Response(
+            {"error": f"At most {MAX_API_PASSWORDS} users with passwords per request; use the provision_users command"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    results = provision_users(rows, dry_run=dry_run)
+    succeeded = sum(1 for result in results if result['status'] != 'invalid')
+    if not succeeded:
+        response_status = status.HTTP_400_BAD_REQUEST
+    else:
+        response_status = status.HTTP_200_OK if dry_run else status.HTTP_201_CREATED
+    return Response(
+        {'valid' if dry_run else 'created': succeeded, 'failed': len(results) - succeeded, 'results': results},
+        status=response_status
+    )
+
+
 
 
 
@@ -119,16 +182,52 @@ def create_project(request):
 
 
 # 👩‍🏫 Supervisor - View All StudentLeads Assigned to Them
+STUDENT_ORDERING_FIELDS = {'first_name', 'last_name', 'programme'}
+
+
 @api_view(['GET'])
+@permission_classes([IsAuthenticated])
 def supervisor_students(request):
-
+    """
+    The logged-in supervisor's students, paginated (?page=, ?page_size=).
+    Filter with ?programme=<exact> and ?name=<first or last name prefix>;
+    sort with ?ordering=first_name|last_name|programme (prefix "-" to reverse).
+    """
     if request.user.role != 'supervisor':
         return Response({"error": "You are not authorized to view this list."}, status=status.HTTP_403_FORBIDDEN)
-    
-    student_leads = StudentLead.objects.filter(supervisor__user__username=request.user.username)
-    student_leads = StudentLead.objects.all()
-    serializer = StudentLeadSerializer(student_leads, many=True)
-    return Response(serializer.data)
+
+    student_leads = prepare_queryset(
+        StudentLead.objects.filter(supervisor_id=request.user.id), StudentLeadSerializer, request
+    )
+
+    programme = request.query_params.get('programme')
+    if programme:
+        student_leads = student_leads.filter(programme=programme)
+
+    name = request.query_params.get('name', '').lower()
+    if name:
+        # Ranges over the lower(<name>) indexes, which istartswith's UPPER(...) LIKE can't use
+        end = name[:-1] + chr(ord(name[-1]) + 1)
+        student_leads = student_leads.alias(
+            first_name_lower=Lower('first_name'), last_name_lower=Lower('last_name')
+        ).filter(
+            Q(first_name_lower__gte=name, first_name_lower__lt=end)
+            | Q(last_name_lower__gte=name, last_name_lower__lt=end)
+        )
+
+    ordering = request.query_params.get('ordering', 'last_name')
+    if ordering.lstrip('-') not in STUDENT_ORDERING_FIELDS:
+        return Response({"error": f"Cannot order by '{ordering}'."}, status=status.HTTP_400_BAD_REQUEST)
+    if ordering.lstrip('-') == 'last_name':
+        ordering = [ordering, ordering.replace('last_name', 'first_name')]
+    else:
+        ordering = [ordering]
+    student_leads = student_leads.order_by(*ordering, 'user_id')
+
+    paginator = StandardResultsSetPagination()
+    page = paginator.paginate_queryset(student_leads, request)
+    serializer = StudentLeadSerializer(page, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
 
 
 
@@ -188,17 +287,68 @@ class CreateStudentLeadAPIView(APIView):
 
 
 
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponseNotModified
 from .models import Supervisor, StudentLead  # Assuming you store users in this model
+from .directory import get_directory
+from .dashboard import get_dashboard
+from .fieldsets import FieldsetQuerysetMixin, prepare_queryset, section_fieldset
+from .exports import cohort, export_response
 
 def list_supervisors(request):
-    supervisors = Supervisor.objects.filter().values("user_id", "first_name", "last_name", "department")
-    return JsonResponse(list(supervisors), safe=False)
+    # Pre-rendered snapshot, invalidated whenever a Supervisor changes
+    body, etag = get_directory()
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
 
 
 
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_students(request):
+    """Stream the caller's cohort of student leads, with their supervisor and project (?output=csv|ndjson)."""
+    students = cohort(StudentLead.objects.order_by('user_id'), request.user, 'supervisor_id')
+    if students is None:
+        return Response({"error": "Only supervisors and admins can export cohort data."}, status=status.HTTP_403_FORBIDDEN)
+    return export_response(request, students, [
+        ('user_id', 'user_id'),
+        ('username', 'user__username'),
+        ('email', 'user__email'),
+        ('first_name', 'first_name'),
+        ('last_name', 'last_name'),
+        ('programme', 'programme'),
+        ('supervisor_id', 'supervisor_id'),
+        ('supervisor_first_name', 'supervisor__first_name'),
+        ('supervisor_last_name', 'supervisor__last_name'),
+        ('department', 'supervisor__department'),
+        ('project_title', 'user__studentproject__title'),
+    ], 'students')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_projects(request):
+    """Stream the projects of the caller's cohort (?output=csv|ndjson)."""
+    projects = cohort(StudentProject.objects.order_by('user_id'), request.user, 'user__studentlead__supervisor_id')
+    if projects is None:
+        return Response({"error": "Only supervisors and admins can export cohort data."}, status=status.HTTP_403_FORBIDDEN)
+    return export_response(request, projects, [
+        ('user_id', 'user_id'),
+        ('student_first_name', 'user__studentlead__first_name'),
+        ('student_last_name', 'user__studentlead__last_name'),
+        ('programme', 'user__studentlead__programme'),
+        ('supervisor_id', 'user__studentlead__supervisor_id'),
+        ('title', 'title'),
+        ('description', 'description'),
+    ], 'projects')
+
+
 class SupervisorStudentDetailView(RetrieveAPIView):
     queryset = Supervisor.objects.all()
     serializer_class = SupervisorSerializer
@@ -209,45 +359,85 @@ class SupervisorStudentDetailView(RetrieveAPIView):
 
         try:
             # Get supervisor by user_id
-            supervisor = Supervisor.objects.get(user_id=user_id)
-            
-            # Get students who selected this supervisor
-            students = StudentLead.objects.filter(supervisor=supervisor)
-            
+            supervisor = Supervisor.objects.select_related('user').get(user_id=user_id)
+
+            # Students of this supervisor with their user and project joined in,
+            # so the query count doesn't grow with the cohort
+            students = StudentLead.objects.filter(supervisor=supervisor).select_related(
+                'user__studentproject'
+            ).order_by('last_name', 'first_name', 'user_id')
+
+            paginator = StandardResultsSetPagination()
+            page = paginator.paginate_queryset(students, request, view=self)
+
             # Serialize supervisor data
             supervisor_data = SupervisorSerializer(supervisor).data
-            
+
             # Create student list with projects
             student_list = []
-            for student in students:
-                student_projects = StudentProject.objects.filter(user=student.user)
+            for student in page:
+                student_projects = [student.user.studentproject] if hasattr(student.user, 'studentproject') else []
                 project_data = ProjectSerializer(student_projects, many=True).data
-                
+
                 student_list.append({
-                    "user_id": student.user.id,
+                    "user_id": student.user_id,
                     "first_name": student.first_name,
                     "last_name": student.last_name,
                     "programme": student.programme,
                     "projects": project_data
                 })
-            
+
             # Combine supervisor details with student list
             response_data = {
                 "supervisor": supervisor_data,
-                "students": student_list
+                "students": student_list,
+                "count": paginator.page.paginator.count,
+                "next": paginator.get_next_link(),
+                "previous": paginator.get_previous_link(),
             }
-            
+
             return Response(response_data, status=status.HTTP_200_OK)
 
         except ObjectDoesNotExist:
             return Response({"error": "Supervisor not found"}, status=status.HTTP_404_NOT_FOUND)
 
+        except NotFound:
+            raise
+
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def student_dashboard(request, user_id):
+    """
+    One-request dashboard of a student: the data of onestudentlead,
+    view_project, members/view, chapters/files_list and the chat inbox.
+    Visible to the student and their supervisor.
+    """
+    # Authorize before anything is built or cached
+    student_lead = StudentLead.objects.filter(user_id=user_id).values('supervisor_id').first()
+    if student_lead is None:
+        return Response({"error": "Student not found"}, status=status.HTTP_404_NOT_FOUND)
+    if request.user.id not in (user_id, student_lead['supervisor_id']):
+        return Response({"error": "You are not authorized to view this dashboard."}, status=status.HTTP_403_FORBIDDEN)
+
+    dashboard = get_dashboard(user_id)
+    if dashboard is None:
+        return Response({"error": "Student not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    conversations = [
+        {**conversation, 'unread': conversation[
+            'supervisor_unread' if request.user.id == conversation['supervisor'] else 'student_unread'
+        ]}
+        for conversation in dashboard['conversations']
+    ]
+    return Response({**dashboard, 'conversations': conversations})
+
+
 class StudentLeadDetailView(RetrieveAPIView):
     queryset = StudentLead.objects.all()
     serializer_class = StudentLeadSerializer
@@ -258,22 +448,29 @@ class StudentLeadDetailView(RetrieveAPIView):
 
         try:
             # Get student lead by user_id
-            student_lead = StudentLead.objects.get(user_id=user_id)
+            student_lead = prepare_queryset(StudentLead.objects, StudentLeadSerializer, request).get(user_id=user_id)
+            context = {'request': request}
             
             # Get project created by this student
-            project = StudentProject.objects.filter(user_id=user_id)
+            projects = section_fieldset(request, 'projects')
+            project = prepare_queryset(
+                StudentProject.objects.filter(user_id=user_id), ProjectSerializer, request, projects
+            )
             # Serialize project data
-            project_data = ProjectSerializer(project, many=True).data
+            project_data = ProjectSerializer(project, many=True, context=context, fieldset=projects).data
 
             # Get members created by this student
-            member = ProjectMembers.objects.filter(user_id=user_id)
+            members = section_fieldset(request, 'members')
+            member = prepare_queryset(
+                ProjectMembers.objects.filter(user_id=user_id), StudentMemberSerializer, request, members
+            )
             # serialize the data
-            member_data = StudentMemberSerializer(member, many=True).data
+            member_data = StudentMemberSerializer(member, many=True, context=context, fieldset=members).data
 
 
             # Combine student lead details with project list
             response_data = {
-                "student_lead": StudentLeadSerializer(student_lead).data,
+                "student_lead": StudentLeadSerializer(student_lead, context=context).data,
                 "projects": project_data,
                 "members": member_data
             }
@@ -289,7 +486,7 @@ class StudentLeadDetailView(RetrieveAPIView):
 
 
 
-class SupervisorDetailView(RetrieveAPIView):
+class SupervisorDetailView(FieldsetQuerysetMixin, RetrieveAPIView):
     queryset = Supervisor.objects.all()
     serializer_class = SupervisorSerializer
     lookup_field = "user_id"
@@ -335,17 +532,20 @@ class ProjectStudentDetailView(RetrieveAPIView):
 
         try:
             # Get student lead by user_id
-            student_lead = StudentLead.objects.get(user_id=user_id)
+            student_lead = prepare_queryset(StudentLead.objects, StudentLeadSerializer, request).get(user_id=user_id)
             
             # Get project created by this student
-            project = StudentProject.objects.filter(user_id=user_id)
+            projects = section_fieldset(request, 'projects')
+            project = prepare_queryset(
+                StudentProject.objects.filter(user_id=user_id), ProjectSerializer, request, projects
+            )
 
             # Serialize project data
-            project_data = ProjectSerializer(project, many=True).data
+            project_data = ProjectSerializer(project, many=True, context={'request': request}, fieldset=projects).data
 
             # Combine student lead details with project list
             response_data = {
-                "student_lead": StudentLeadSerializer(student_lead).data,
+                "student_lead": StudentLeadSerializer(student_lead, context={'request': request}).data,
                 "projects": project_data
             }
 